@@ -1,494 +1,34 @@
-import numpy as np
-import time
+import argparse
+import os
 import tkinter as tk
 from tkinter import messagebox
-import threading
-from typing import List, Tuple, Optional, Dict
 
-class ConnectFour:
-    
-    def __init__(self, rows=6, cols=7):
-        self.ROWS = rows
-        self.COLS = cols
-        self.board = np.zeros((rows, cols), dtype=int)
-        self.current_player = 1  # Player 1 starts
-        self.last_move = None
-        self.move_history = []
-        
-    def copy(self):
-        new_game = ConnectFour(self.ROWS, self.COLS)
-        new_game.board = self.board.copy()
-        new_game.current_player = self.current_player
-        new_game.last_move = self.last_move
-        new_game.move_history = self.move_history.copy()
-        return new_game
-    
-    def get_valid_moves(self) -> List[int]:
-        valid_moves = []
-        for col in range(self.COLS):
-            if self.board[0][col] == 0:  # Top row is empty
-                valid_moves.append(col)
-        return valid_moves
-    
-    # Check if move is valid
-    def is_valid_move(self, col: int) -> bool:
-        if col < 0 or col >= self.COLS:
-            return False
-        return self.board[0][col] == 0
-    
-    # Get the next open row in a column
-    def get_next_open_row(self, col: int) -> Optional[int]:
-        for row in range(self.ROWS - 1, -1, -1):
-            if self.board[row][col] == 0:
-                return row
-        return None
-    
-    # Make a move
-    def make_move(self, col: int, player: Optional[int] = None) -> bool:
-        if not self.is_valid_move(col):
-            return False
-        
-        row = self.get_next_open_row(col)
-        if row is None:
-            return False
-        
-        if player is None:
-            player = self.current_player
-            
-        self.board[row][col] = player
-        self.last_move = (row, col)
-        self.move_history.append(col)
-        
-        # Switch player
-        self.current_player = 3 - self.current_player  # 1->2, 2->1
-        
-        return True
-    
-    # Check for a winner
-    def check_winner(self) -> Optional[int]:
-        # Check horizontal
-        for row in range(self.ROWS):
-            for col in range(self.COLS - 3):
-                if (self.board[row][col] != 0 and
-                    self.board[row][col] == self.board[row][col+1] ==
-                    self.board[row][col+2] == self.board[row][col+3]):
-                    return self.board[row][col]
-        
-        # Check vertical
-        for row in range(self.ROWS - 3):
-            for col in range(self.COLS):
-                if (self.board[row][col] != 0 and
-                    self.board[row][col] == self.board[row+1][col] ==
-                    self.board[row+2][col] == self.board[row+3][col]):
-                    return self.board[row][col]
-        
-        # Check diagonal
-        for row in range(3, self.ROWS):
-            for col in range(self.COLS - 3):
-                if (self.board[row][col] != 0 and
-                    self.board[row][col] == self.board[row-1][col+1] ==
-                    self.board[row-2][col+2] == self.board[row-3][col+3]):
-                    return self.board[row][col]
-        
-        for row in range(self.ROWS - 3):
-            for col in range(self.COLS - 3):
-                if (self.board[row][col] != 0 and
-                    self.board[row][col] == self.board[row+1][col+1] ==
-                    self.board[row+2][col+2] == self.board[row+3][col+3]):
-                    return self.board[row][col]
-        
-        return None
-    
-    # Check if game is done
-    def is_game_done(self) -> bool:
-        # Check for winner
-        if self.check_winner() is not None:
-            return True
-        
-        # Check for draw
-        if len(self.get_valid_moves()) == 0:
-            return True
-        
-        return False
-    
-    
-    # display board
-    def display(self):
-        print("\n" + " ".join([str(i) for i in range(self.COLS)]))
-        print("-" * (self.COLS * 2 - 1))
-        
-        symbols = {0: ".", 1: "X", 2: "O"}
-        for row in range(self.ROWS):
-            print(" ".join([symbols[self.board[row][col]] for col in range(self.COLS)]))
-        print()
-    
-    # string representation of the board
-    def __str__(self):
-        symbols = {0: ".", 1: "X", 2: "O"}
-        result = []
-        for row in range(self.ROWS):
-            result.append(" ".join([symbols[self.board[row][col]] for col in range(self.COLS)]))
-        return "\n".join(result)
+from connect_four_engine import (AlphaBetaAgent, BitboardConnectFour, EngineWorker,
+                                 MCTSAgent, MinimaxAgent, OpeningBook, PVSAgent,
+                                 SearchInstrumentation)
 
-class Evaluator:
-    
-    def __init__(self, game: ConnectFour):
-        self.game = game
-        self.ROWS = game.ROWS
-        self.COLS = game.COLS
-    
-    def count_windows(self, board: np.ndarray, player: int) -> Dict[str, int]:
-        counts = {
-            'four': 0,      # Four in a row (win)
-            'three': 0,     # Three with one empty
-            'two': 0,       # Two with two empty
-            'blocked': 0    # Opponent can block
-        }
-        
-        opponent = 3 - player
-        
-        # Helper function to evaluate a window
-        def evaluate_window(window):
-            player_count = np.count_nonzero(window == player)
-            opponent_count = np.count_nonzero(window == opponent)
-            empty_count = np.count_nonzero(window == 0)
-            
-            if player_count == 4:
-                counts['four'] += 1
-            elif player_count == 3 and empty_count == 1:
-                counts['three'] += 1
-            elif player_count == 2 and empty_count == 2:
-                counts['two'] += 1
-            elif opponent_count > 0 and player_count > 0:
-                counts['blocked'] += 1
-        
-        # Check horizontal windows
-        for row in range(self.ROWS):
-            for col in range(self.COLS - 3):
-                window = board[row, col:col+4]
-                evaluate_window(window)
-        
-        # Check vertical windows
-        for row in range(self.ROWS - 3):
-            for col in range(self.COLS):
-                window = board[row:row+4, col]
-                evaluate_window(window)
-        
-        # Check diagonal
-        for row in range(3, self.ROWS):
-            for col in range(self.COLS - 3):
-                window = np.array([board[row-i][col+i] for i in range(4)])
-                evaluate_window(window)
-        
-        for row in range(self.ROWS - 3):
-            for col in range(self.COLS - 3):
-                window = np.array([board[row+i][col+i] for i in range(4)])
-                evaluate_window(window)
-        
-        return counts
-    
-    def evaluate_center_control(self, board: np.ndarray, player: int) -> int:
-        center_col = self.COLS // 2
-        center_array = board[:, center_col]
-        return np.count_nonzero(center_array == player) * 3
-    
-    def evaluate_position(self, board: np.ndarray, player: int) -> float:
-        
-        # Check for terminal state first
-        temp_game = ConnectFour(self.ROWS, self.COLS)
-        temp_game.board = board.copy()
-        
-        winner = temp_game.check_winner()
-        if winner == player:
-            return 1000  # Win
-        elif winner == (3 - player):
-            return -1000  # Loss
-        
-        # Non-terminal evaluation
-        score = 0
-        
-        # Count windows for player
-        player_windows = self.count_windows(board, player)
-        score += player_windows['four'] * 1000
-        score += player_windows['three'] * 10
-        score += player_windows['two'] * 2
-        
-        # Count windows for opponent
-        opponent = 3 - player
-        opponent_windows = self.count_windows(board, opponent)
-        score -= opponent_windows['four'] * 1000
-        score -= opponent_windows['three'] * 10
-        score -= opponent_windows['two'] * 2
-        
-        # Center control bonus
-        score += self.evaluate_center_control(board, player)
-        score -= self.evaluate_center_control(board, opponent)
-        
-        return score
-
-class MinimaxAgent:
-    
-    def __init__(self, game: ConnectFour, max_depth: int = 6):
-        self.game = game
-        self.max_depth = max_depth
-        self.evaluator = Evaluator(game)
-        
-        # Performance metrics
-        self.nodes_explored = 0
-        self.max_depth_reached = 0
-        self.start_time = 0
-        self.end_time = 0
-        
-    # Reset performance metrics
-    def reset_metrics(self):
-        self.nodes_explored = 0
-        self.max_depth_reached = 0
-        self.start_time = 0
-        self.end_time = 0
-    
-    def minimax(self, game_state: ConnectFour, depth: int, 
-                maximizing_player: bool, player: int) -> Tuple[float, Optional[int]]:
-
-        # Update metrics
-        self.nodes_explored += 1
-        self.max_depth_reached = max(self.max_depth_reached, 
-                                     self.max_depth - depth)
-        
-        # Get valid moves
-        valid_moves = game_state.get_valid_moves()
-        
-        # Terminal state or depth limit reached
-        if depth == 0 or game_state.is_game_done() or len(valid_moves) == 0:
-            if game_state.is_game_done():
-                winner = game_state.check_winner()
-                if winner == player:
-                    return (1000000, None)  # Win
-                elif winner is not None:
-                    return (-1000000, None)  # Loss
-                else:
-                    return (0, None)  # Draw
-            else:
-                # Evaluate non-terminal position
-                score = self.evaluator.evaluate_position(game_state.board, player)
-                return (score, None)
-        
-        # Order moves (center column first for better performance)
-        center_col = game_state.COLS // 2
-        valid_moves = sorted(valid_moves, 
-                           key=lambda x: abs(x - center_col))
-        
-        if maximizing_player:
-            # MAX player (trying to maximize score)
-            max_eval = float('-inf')
-            best_move = valid_moves[0]
-            
-            for move in valid_moves:
-                # Create child state
-                child = game_state.copy()
-                child.make_move(move)
-                
-                # Recursive call
-                eval_score, _ = self.minimax(child, depth - 1, False, player)
-                
-                if eval_score > max_eval:
-                    max_eval = eval_score
-                    best_move = move
-            
-            return (max_eval, best_move)
-        
-        else:
-            # MIN player (trying to minimize score)
-            min_eval = float('inf')
-            best_move = valid_moves[0]
-            
-            for move in valid_moves:
-                # Create child state
-                child = game_state.copy()
-                child.make_move(move)
-                
-                # Recursive call
-                eval_score, _ = self.minimax(child, depth - 1, True, player)
-                
-                if eval_score < min_eval:
-                    min_eval = eval_score
-                    best_move = move
-            
-            return (min_eval, best_move)
-    
-    def get_best_move(self, game_state: ConnectFour, player: int) -> Tuple[int, Dict]:
-        self.reset_metrics()
-        self.start_time = time.time()
-        
-        # Determine if current player is maximizing
-        maximizing = (player == 1)
-        
-        # Call minimax
-        score, best_move = self.minimax(game_state, self.max_depth, 
-                                       maximizing, player)
-        
-        self.end_time = time.time()
-        
-        # Compile metrics
-        metrics = {
-            'algorithm': 'Minimax',
-            'nodes_explored': self.nodes_explored,
-            'max_depth_reached': self.max_depth_reached,
-            'time_taken': self.end_time - self.start_time,
-            'best_score': score,
-            'best_move': best_move
-        }
-        
-        return best_move, metrics
-
-
-class AlphaBetaAgent:
-    def __init__(self, game: ConnectFour, max_depth: int = 6):
-        self.game = game
-        self.max_depth = max_depth
-        self.evaluator = Evaluator(game)
-        
-        # Performance metrics
-        self.nodes_explored = 0
-        self.max_depth_reached = 0
-        self.pruning_count = 0  # Number of branches pruned
-        self.start_time = 0
-        self.end_time = 0
-        
-    def reset_metrics(self):
-        self.nodes_explored = 0
-        self.max_depth_reached = 0
-        self.pruning_count = 0
-        self.start_time = 0
-        self.end_time = 0
-    
-    def alpha_beta(self, game_state: ConnectFour, depth: int, 
-                   alpha: float, beta: float,
-                   maximizing_player: bool, player: int) -> Tuple[float, Optional[int]]:
-    
-        # Update metrics
-        self.nodes_explored += 1
-        self.max_depth_reached = max(self.max_depth_reached, 
-                                     self.max_depth - depth)
-        
-        # Get valid moves
-        valid_moves = game_state.get_valid_moves()
-        
-        # Terminal state or depth limit reached
-        if depth == 0 or game_state.is_game_done() or len(valid_moves) == 0:
-            if game_state.is_game_done():
-                winner = game_state.check_winner()
-                if winner == player:
-                    return (1000000, None)  # Win
-                elif winner is not None:
-                    return (-1000000, None)  # Loss
-                else:
-                    return (0, None)  # Draw
-            else:
-                # Evaluate non-terminal position
-                score = self.evaluator.evaluate_position(game_state.board, player)
-                return (score, None)
-        
-        # Order moves (center column first for better pruning)
-        center_col = game_state.COLS // 2
-        valid_moves = sorted(valid_moves, 
-                           key=lambda x: abs(x - center_col))
-        
-        if maximizing_player:
-            # MAX player (trying to maximize score)
-            max_eval = float('-inf')
-            best_move = valid_moves[0]
-            
-            for move in valid_moves:
-                # Create child state
-                child = game_state.copy()
-                child.make_move(move)
-                
-                # Recursive call
-                eval_score, _ = self.alpha_beta(child, depth - 1, 
-                                               alpha, beta, False, player)
-                
-                if eval_score > max_eval:
-                    max_eval = eval_score
-                    best_move = move
-                
-                # Update alpha
-                alpha = max(alpha, eval_score)
-                
-                # Beta cutoff (pruning)
-                if beta <= alpha:
-                    self.pruning_count += 1
-                    break  # Prune remaining branches
-            
-            return (max_eval, best_move)
-        
-        else:
-            # MIN player (trying to minimize score)
-            min_eval = float('inf')
-            best_move = valid_moves[0]
-            
-            for move in valid_moves:
-                # Create child state
-                child = game_state.copy()
-                child.make_move(move)
-                
-                # Recursive call
-                eval_score, _ = self.alpha_beta(child, depth - 1, 
-                                               alpha, beta, True, player)
-                
-                if eval_score < min_eval:
-                    min_eval = eval_score
-                    best_move = move
-                
-                # Update beta
-                beta = min(beta, eval_score)
-                
-                # Alpha cutoff (pruning)
-                if beta <= alpha:
-                    self.pruning_count += 1
-                    break  # Prune remaining branches
-            
-            return (min_eval, best_move)
-    
-    def get_best_move(self, game_state: ConnectFour, player: int) -> Tuple[int, Dict]:
-        self.reset_metrics()
-        self.start_time = time.time()
-        
-        # Determine if current player is maximizing
-        maximizing = (player == 1)
-        
-        # Call alpha-beta with initial alpha and beta values
-        score, best_move = self.alpha_beta(game_state, self.max_depth,
-                                          float('-inf'), float('inf'),
-                                          maximizing, player)
-        
-        self.end_time = time.time()
-        
-        # Compile metrics
-        metrics = {
-            'algorithm': 'Alpha-Beta',
-            'nodes_explored': self.nodes_explored,
-            'max_depth_reached': self.max_depth_reached,
-            'pruning_count': self.pruning_count,
-            'time_taken': self.end_time - self.start_time,
-            'best_score': score,
-            'best_move': best_move
-        }
-        
-        return best_move, metrics
-    
 
 class ConnectFourGUI:
         
-    def __init__(self, root):
+    # move_delay_ms is the least time between the player's move and the AI's
+    # answer appearing on the board (0 shows it as soon as it is found).
+    # rows, cols and connect select a variant board.
+    def __init__(self, root, move_delay_ms: int = 500,
+                 rows: int = 6, cols: int = 7, connect: int = 4):
         self.root = root
-        self.root.title("Connect Four - AI Challenge")
+        if connect == 4:
+            self.TITLE = "Connect Four - AI Challenge"
+        else:
+            self.TITLE = f"Connect {connect} - AI Challenge"
+        self.root.title(self.TITLE)
         self.root.resizable(False, False)
         
-        # Game settings
-        self.ROWS = 6
-        self.COLS = 7
-        self.CELL_SIZE = 80
-        self.PIECE_RADIUS = 30
+        # Game settings; cells shrink so large boards still fit on screen
+        self.ROWS = rows
+        self.COLS = cols
+        self.CONNECT = connect
+        self.CELL_SIZE = min(80, 640 // cols, 560 // rows)
+        self.PIECE_RADIUS = self.CELL_SIZE * 3 // 8
         
         # Colors
         self.BG_COLOR = "#1e3a5f"
@@ -503,11 +43,28 @@ class ConnectFourGUI:
         self.game = None
         self.ai_agent = None
         self.ai_depth = 5
+        self.time_budget = 0.0  # Seconds per AI move, 0 searches to ai_depth
+        self.ai_workers = 1     # Processes used by the Alpha-Beta/PVS search
+        self.ponder_enabled = True  # Search the AI's answers on the player's turn
+        self.pondering = False
+        self.move_delay_ms = move_delay_ms
+        
+        # Every search runs on this one thread; new_game() cancels it
+        self.engine = EngineWorker()
         self.use_alphabeta = True
         self.player_turn = True  # Player starts first
         self.game_over = False
         self.thinking = False
         
+        # Opening book generated offline by build_opening_book.py, if present
+        self.opening_book = None
+        book_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+        if os.path.exists(book_path):
+            try:
+                self.opening_book = OpeningBook(book_path)
+            except (OSError, ValueError) as e:
+                print(f"Opening book not loaded: {e}")
+        
         # Statistics
         self.stats = {
             'player_wins': 0,
@@ -527,7 +84,7 @@ class ConnectFourGUI:
         # Title
         title_label = tk.Label(
             main_frame,
-            text="Connect Four - AI Challenge",
+            text=self.TITLE,
             font=("Arial", 24, "bold"),
             bg=self.BG_COLOR,
             fg="white"
@@ -574,6 +131,18 @@ class ConnectFourGUI:
             command=self.update_algorithm
         ).pack(anchor="w")
         
+        tk.Radiobutton(
+            algo_frame,
+            text="PVS / Negamax (Fastest)",
+            variable=self.algo_var,
+            value="pvs",
+            font=("Arial", 10),
+            bg=self.BG_COLOR,
+            fg="white",
+            selectcolor=self.BOARD_COLOR,
+            command=self.update_algorithm
+        ).pack(anchor="w")
+        
         tk.Radiobutton(
             algo_frame,
             text="Minimax (Slower)",
@@ -586,6 +155,18 @@ class ConnectFourGUI:
             command=self.update_algorithm
         ).pack(anchor="w")
         
+        tk.Radiobutton(
+            algo_frame,
+            text="Monte Carlo Tree Search (Large Boards)",
+            variable=self.algo_var,
+            value="mcts",
+            font=("Arial", 10),
+            bg=self.BG_COLOR,
+            fg="white",
+            selectcolor=self.BOARD_COLOR,
+            command=self.update_algorithm
+        ).pack(anchor="w")
+        
         # Difficulty selection
         difficulty_frame = tk.LabelFrame(
             control_frame,
@@ -630,6 +211,65 @@ class ConnectFourGUI:
         )
         self.difficulty_label.pack()
         
+        tk.Label(
+            difficulty_frame,
+            text="Time Budget (s, 0 = off):",
+            font=("Arial", 10),
+            bg=self.BG_COLOR,
+            fg="white"
+        ).pack()
+        
+        self.time_budget_var = tk.DoubleVar(value=0.0)
+        time_scale = tk.Scale(
+            difficulty_frame,
+            from_=0,
+            to=10,
+            resolution=0.5,
+            orient="horizontal",
+            variable=self.time_budget_var,
+            command=self.update_time_budget,
+            bg=self.BG_COLOR,
+            fg="white",
+            highlightbackground=self.BG_COLOR,
+            length=200
+        )
+        time_scale.pack()
+        
+        tk.Label(
+            difficulty_frame,
+            text="CPU Workers:",
+            font=("Arial", 10),
+            bg=self.BG_COLOR,
+            fg="white"
+        ).pack()
+        
+        self.workers_var = tk.IntVar(value=1)
+        workers_scale = tk.Scale(
+            difficulty_frame,
+            from_=1,
+            to=max(1, os.cpu_count() or 1),
+            orient="horizontal",
+            variable=self.workers_var,
+            command=self.update_workers,
+            bg=self.BG_COLOR,
+            fg="white",
+            highlightbackground=self.BG_COLOR,
+            length=200
+        )
+        workers_scale.pack()
+        
+        self.ponder_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            difficulty_frame,
+            text="Think on your turn",
+            variable=self.ponder_var,
+            command=self.update_ponder,
+            font=("Arial", 10),
+            bg=self.BG_COLOR,
+            fg="white",
+            selectcolor=self.BOARD_COLOR
+        ).pack()
+        
         # Status Panel
         status_frame = tk.LabelFrame(
             control_frame,
@@ -743,6 +383,7 @@ class ConnectFourGUI:
         self.canvas.delete("all")
         
         # Draw grid and pieces
+        board = self.game.board
         for row in range(self.ROWS):
             for col in range(self.COLS):
                 x = col * self.CELL_SIZE + self.CELL_SIZE // 2
@@ -760,9 +401,9 @@ class ConnectFourGUI:
                 )
                 
                 # Draw piece or empty hole
-                if self.game.board[row][col] == 0:
+                if board[row][col] == 0:
                     color = self.EMPTY_COLOR
-                elif self.game.board[row][col] == 1:
+                elif board[row][col] == 1:
                     color = self.PLAYER_COLOR
                 else:
                     color = self.AI_COLOR
@@ -797,6 +438,7 @@ class ConnectFourGUI:
             self.make_player_move(col)
     
     def make_player_move(self, col):
+        self.stop_pondering()
         self.game.make_move(col, 1)
         self.draw_board()
         
@@ -806,35 +448,66 @@ class ConnectFourGUI:
         self.player_turn = False
         self.update_status("AI is thinking...")
         
-        # AI move in separate thread to keep GUI responsive
-        threading.Thread(target=self.make_ai_move, daemon=True).start()
+        # The search runs on the engine thread to keep the GUI responsive
+        self.make_ai_move()
     
     def make_ai_move(self):
         self.thinking = True
+        agent = self.ai_agent
+        game = self.game.copy()
+        generation = None
         
-        try:
-            move, metrics = self.ai_agent.get_best_move(self.game, 2)
-            
+        def on_done(result):
+            move, metrics = result
+            delay = max(0, int(self.move_delay_ms - metrics['time_taken'] * 1000))
             # Update UI in main thread
-            self.root.after(500, lambda: self.complete_ai_move(move, metrics))
-        except Exception as e:
+            self.root.after(delay, lambda: self.complete_ai_move(move, metrics, generation))
+        
+        def on_error(e):
             print(f"AI Error: {e}")
-            self.root.after(0, lambda: self.update_status("AI Error!"))
-            self.thinking = False
+            self.root.after(0, lambda: self.fail_ai_move(generation))
+        
+        generation = self.engine.submit(agent, lambda: agent.get_best_move(game, 2),
+                                        on_done, on_error)
+    
+    def fail_ai_move(self, generation):
+        if not self.engine.is_current(generation):
+            return
+        self.update_status("AI Error!")
+        self.thinking = False
     
-    def complete_ai_move(self, move, metrics):
+    def complete_ai_move(self, move, metrics, generation):
+        # Drop answers for a game that has been abandoned since
+        if not self.engine.is_current(generation):
+            return
+        
         self.game.make_move(move, 2)
         self.draw_board()
         
         nodes = metrics['nodes_explored']
         time_taken = metrics['time_taken']
-        self.update_status(f"AI played column {move}\n({nodes} nodes, {time_taken:.2f}s)")
+        if metrics.get('pondered'):
+            self.update_status(f"AI played column {move}\n(answered from pondering)")
+        elif metrics.get('book_hit'):
+            self.update_status(f"AI played column {move}\n(opening book)")
+        elif 'endgame_result' in metrics:
+            result = metrics['endgame_result']
+            self.update_status(f"AI played column {move}\n(solved: AI {result}, {nodes} nodes)")
+        elif metrics['algorithm'] == MCTSAgent.ALGORITHM_NAME:
+            playouts = metrics['playouts']
+            self.update_status(f"AI played column {move}\n({playouts} playouts, {time_taken:.2f}s)")
+        elif 'time_limit' in metrics:
+            depth = metrics['depth_completed']
+            self.update_status(f"AI played column {move}\n({nodes} nodes, depth {depth}, {time_taken:.2f}s)")
+        else:
+            self.update_status(f"AI played column {move}\n({nodes} nodes, {time_taken:.2f}s)")
+        
+        self.thinking = False
         
         if not self.check_game_over():
             self.player_turn = True
             self.update_status("Your Turn!")
-        
-        self.thinking = False
+            self.start_pondering()
     
     def check_game_over(self):
         if not self.game.is_game_done():
@@ -863,21 +536,84 @@ class ConnectFourGUI:
         return True
     
     def new_game(self):
-        self.game = ConnectFour()
+        # Abandon any search still running for the old game
+        self.engine.cancel()
+        self.pondering = False
+        self.game = BitboardConnectFour(self.ROWS, self.COLS, self.CONNECT)
         self.update_algorithm()
         self.player_turn = True
         self.game_over = False
         self.thinking = False
         self.draw_board()
         self.update_status("Your Turn!")
+        self.start_pondering()
     
     def update_algorithm(self):
-        self.use_alphabeta = (self.algo_var.get() == "alphabeta")
-        
-        if self.use_alphabeta:
-            self.ai_agent = AlphaBetaAgent(self.game, max_depth=self.ai_depth)
+        self.stop_pondering()
+        algorithm = self.algo_var.get()
+        self.use_alphabeta = (algorithm == "alphabeta")
+        time_limit = self.time_budget if self.time_budget > 0 else None
+        
+        # Progress only: the detailed statistics would slow the search down
+        progress = SearchInstrumentation(self.report_progress, collect_stats=False)
+        
+        if algorithm == "pvs":
+            self.ai_agent = PVSAgent(self.game, max_depth=self.ai_depth,
+                                     time_limit=time_limit,
+                                     opening_book=self.opening_book,
+                                     workers=self.ai_workers,
+                                     instrumentation=progress)
+        elif algorithm == "mcts":
+            # Plays for the time budget, or a fixed number of iterations
+            # without one; the search depth does not apply
+            self.ai_agent = MCTSAgent(self.game, time_limit=time_limit,
+                                      workers=self.ai_workers,
+                                      instrumentation=progress)
+        elif self.use_alphabeta:
+            self.ai_agent = AlphaBetaAgent(self.game, max_depth=self.ai_depth,
+                                           time_limit=time_limit,
+                                           opening_book=self.opening_book,
+                                           workers=self.ai_workers,
+                                           instrumentation=progress)
         else:
             self.ai_agent = MinimaxAgent(self.game, max_depth=self.ai_depth)
+        
+        if self.player_turn and not self.game_over and not self.thinking:
+            self.start_pondering()
+    
+    # Let the agent search its answers while the player thinks
+    def start_pondering(self):
+        self.stop_pondering()
+        if (not self.ponder_enabled or self.game is None
+                or not hasattr(self.ai_agent, 'ponder')):
+            return
+        
+        agent = self.ai_agent
+        game = self.game.copy()
+        self.engine.submit(agent, lambda: agent.ponder(game, 2))
+        self.pondering = True
+    
+    # Stop pondering; a search queued after this waits for the ponder to end
+    def stop_pondering(self):
+        if self.pondering:
+            self.engine.cancel()
+            self.pondering = False
+    
+    def update_ponder(self):
+        self.ponder_enabled = self.ponder_var.get()
+        if self.ponder_enabled and self.player_turn and not self.game_over and not self.thinking:
+            self.start_pondering()
+        else:
+            self.stop_pondering()
+    
+    # Called from the engine thread after each completed search iteration
+    def report_progress(self, depth, score, pv, nodes):
+        self.root.after(0, lambda: self.show_progress(depth, pv, nodes))
+    
+    def show_progress(self, depth, pv, nodes):
+        if self.thinking and not self.pondering:
+            line = " ".join(str(move) for move in pv)
+            self.update_status(f"AI is thinking...\n(depth {depth}, {nodes} nodes, line {line})")
     
     def update_depth(self, value):
         self.ai_depth = int(value)
@@ -896,6 +632,15 @@ class ConnectFourGUI:
         
         self.update_algorithm()
     
+    # Time budget only applies to Alpha-Beta, PVS and MCTS
+    def update_time_budget(self, value):
+        self.time_budget = float(value)
+        self.update_algorithm()
+    
+    def update_workers(self, value):
+        self.ai_workers = int(value)
+        self.update_algorithm()
+    
     def update_status(self, message):
         self.status_label.config(text=message)
         self.root.update()
@@ -950,9 +695,17 @@ Win Rate: {self.get_win_rate():.1f}%"""
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Play Connect Four against the AI")
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=7)
+    parser.add_argument("--connect", type=int, default=4,
+                        help="pieces in a row needed to win")
+    args = parser.parse_args()
+    if min(args.rows, args.cols) < 4 or not 3 <= args.connect <= max(args.rows, args.cols):
+        parser.error("the board needs at least 4 rows and columns, and room for a line")
     
     root = tk.Tk()
-    app = ConnectFourGUI(root)
+    app = ConnectFourGUI(root, rows=args.rows, cols=args.cols, connect=args.connect)
     root.mainloop()
 
 
@@ -0,0 +1,287 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+import connect_four_engine as engine
+
+
+# Fixed positions as move strings (columns from the empty 6x7 board)
+CORPUS = [
+    {'name': 'empty', 'phase': 'opening', 'moves': ''},
+    {'name': 'center-reply', 'phase': 'opening', 'moves': '33'},
+    {'name': 'three-moves', 'phase': 'opening', 'moves': '334'},
+    {'name': 'early-10', 'phase': 'opening', 'moves': '3354513455'},
+    {'name': 'middle-12', 'phase': 'middlegame', 'moves': '343433634464'},
+    {'name': 'middle-16', 'phase': 'middlegame', 'moves': '3324013015334141'},
+    {'name': 'middle-18', 'phase': 'middlegame', 'moves': '553223340444123433'},
+    {'name': 'late-26', 'phase': 'endgame', 'moves': '33543454436155221123622132'},
+    {'name': 'late-30', 'phase': 'endgame', 'moves': '332434411341443312112555000022'},
+]
+
+# Engines by name. The opening book and endgame solver are left out so
+# every engine really searches to the requested depth.
+ENGINES: Dict[str, Callable] = {
+    'minimax': lambda game, depth: engine.MinimaxAgent(game, max_depth=depth),
+    'alphabeta': lambda game, depth: engine.AlphaBetaAgent(game, max_depth=depth,
+                                                           endgame_threshold=0),
+    'alphabeta-aspiration': lambda game, depth: engine.AlphaBetaAgent(
+        game, max_depth=depth, endgame_threshold=0, strategy='aspiration'),
+    'alphabeta-mtdf': lambda game, depth: engine.AlphaBetaAgent(
+        game, max_depth=depth, endgame_threshold=0, strategy='mtdf'),
+    'pvs': lambda game, depth: engine.PVSAgent(game, max_depth=depth, endgame_threshold=0),
+}
+
+# Minimax gets slow quickly, it is capped at this depth unless asked otherwise
+MINIMAX_MAX_DEPTH = 5
+
+# Size scaling: random positions of this many plies on each board size
+SCALING_POSITIONS = 3
+SCALING_PLIES = 8
+
+
+# Board size from "ROWSxCOLS"
+def parse_size(text: str) -> Tuple[int, int]:
+    try:
+        rows, cols = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a size like 7x8: {text}")
+    if rows < 4 or cols < 4:
+        raise argparse.ArgumentTypeError(f"the board needs at least 4 rows and 4 columns: {text}")
+    return rows, cols
+
+
+# Quiet positions for the size scaling run. The seed depends only on the
+# board, so every run benchmarks the same positions.
+def scaling_positions(sizes: List[Tuple[int, int]], connect: int, count: int) -> List[Dict]:
+    positions = []
+    for rows, cols in sizes:
+        rng = random.Random(f"{rows}x{cols}x{connect}")
+        while sum(1 for p in positions if (p['rows'], p['cols']) == (rows, cols)) < count:
+            game = engine.BitboardConnectFour(rows, cols, connect)
+            moves = []
+            while len(moves) < SCALING_PLIES and not game.is_game_done():
+                col = rng.choice(game.get_valid_moves())
+                game.make_move(col)
+                moves.append(col)
+            # Skip positions a tactical shortcut answers without searching
+            if not game.is_game_done() and not game.winning_moves(1) and not game.winning_moves(2):
+                index = sum(1 for p in positions if (p['rows'], p['cols']) == (rows, cols))
+                positions.append({'name': f"random-{index + 1}", 'phase': 'opening',
+                                  'moves': moves, 'rows': rows, 'cols': cols,
+                                  'connect': connect})
+    return positions
+
+
+def build_position(position: Dict):
+    game = engine.BitboardConnectFour(position.get('rows', 6), position.get('cols', 7),
+                                      position.get('connect', 4))
+    for col in position['moves']:
+        if not game.make_move(int(col)) or game.is_game_done():
+            raise ValueError(f"corpus position {position['moves']!r} is not a playable position")
+    return game
+
+
+def board_size(position: Dict) -> str:
+    return f"{position.get('rows', 6)}x{position.get('cols', 7)}"
+
+
+# One timed search from a fresh agent, so caches start cold every time
+def run_once(engine_name: str, position: Dict, depth: int) -> Dict:
+    game = build_position(position)
+    agent = ENGINES[engine_name](game, depth)
+    start = time.perf_counter()
+    move, metrics = agent.get_best_move(game, game.current_player)
+    elapsed = time.perf_counter() - start
+    return {'time': elapsed, 'nodes': metrics['nodes_explored'],
+            'best_move': move, 'best_score': metrics['best_score']}
+
+
+def peak_memory(engine_name: str, position: Dict, depth: int) -> int:
+    tracemalloc.start()
+    try:
+        run_once(engine_name, position, depth)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(engines: List[str], depths: List[int], positions: List[Dict],
+              warmup: int, repeat: int, memory: bool, minimax_max_depth: int) -> Dict:
+    results = []
+    for engine_name in engines:
+        for position in positions:
+            for depth in depths:
+                if engine_name == 'minimax' and depth > minimax_max_depth:
+                    continue
+
+                for _ in range(warmup):
+                    run_once(engine_name, position, depth)
+                runs = [run_once(engine_name, position, depth) for _ in range(repeat)]
+
+                times = [run['time'] for run in runs]
+                median = statistics.median(times)
+                entry = {
+                    'engine': engine_name,
+                    'position': position['name'],
+                    'size': board_size(position),
+                    'connect': position.get('connect', 4),
+                    'phase': position['phase'],
+                    'depth': depth,
+                    'nodes': runs[0]['nodes'],
+                    'best_move': runs[0]['best_move'],
+                    'best_score': runs[0]['best_score'],
+                    'time_median': median,
+                    'time_min': min(times),
+                    'time_max': max(times),
+                    'nodes_per_second': runs[0]['nodes'] / median if median > 0 else 0.0,
+                }
+                if memory:
+                    entry['peak_memory_kb'] = peak_memory(engine_name, position, depth) / 1024
+                results.append(entry)
+
+                print(f"{engine_name:<22} {entry['size']:>5} {position['name']:<14} depth {depth}: "
+                      f"{entry['nodes']:>9} nodes {median * 1000:>9.1f} ms "
+                      f"{entry['nodes_per_second']:>10.0f} nodes/s", flush=True)
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'warmup': warmup,
+            'repeat': repeat,
+        },
+        'results': results,
+        'summary': summarize(results),
+    }
+
+
+# Totals per engine and board size, and the time to reach each depth per
+# engine and phase
+def summarize(results: List[Dict]) -> Dict:
+    summary = {}
+    for entry in results:
+        engine_summary = summary.setdefault(entry['engine'], {
+            'nodes': 0, 'time': 0.0, 'time_to_depth': {}, 'sizes': {}})
+        engine_summary['nodes'] += entry['nodes']
+        engine_summary['time'] += entry['time_median']
+        phase_times = engine_summary['time_to_depth'].setdefault(entry['phase'], {})
+        phase_times.setdefault(str(entry['depth']), []).append(entry['time_median'])
+        size_summary = engine_summary['sizes'].setdefault(entry['size'], {'nodes': 0, 'time': 0.0})
+        size_summary['nodes'] += entry['nodes']
+        size_summary['time'] += entry['time_median']
+
+    for engine_summary in summary.values():
+        for totals in [engine_summary] + list(engine_summary['sizes'].values()):
+            time_taken = totals['time']
+            totals['nodes_per_second'] = totals['nodes'] / time_taken if time_taken else 0.0
+        for phase_times in engine_summary['time_to_depth'].values():
+            for depth, times in phase_times.items():
+                phase_times[depth] = statistics.mean(times)
+    return summary
+
+
+# Entries that got slower than the baseline by more than the tolerance, or
+# whose search result changed. Returns printable lines, empty when clean.
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    # Baselines from before the size scaling run only have 6x7 entries
+    def entry_key(e: Dict) -> Tuple:
+        return e['engine'], e.get('size', '6x7'), e.get('connect', 4), e['position'], e['depth']
+
+    previous = {entry_key(e): e for e in baseline['results']}
+    problems = []
+    for entry in current['results']:
+        key = entry_key(entry)
+        old = previous.get(key)
+        if old is None:
+            continue
+        engine_name, size, connect, position, depth = key
+        label = f"{engine_name} {size} {position} depth {depth}"
+        if connect != 4:
+            label = f"{engine_name} {size} connect {connect} {position} depth {depth}"
+
+        if entry['time_median'] > old['time_median'] * (1 + tolerance):
+            problems.append(f"SLOWER   {label}: {old['time_median'] * 1000:.1f} ms -> "
+                            f"{entry['time_median'] * 1000:.1f} ms")
+        if entry['nodes_per_second'] < old['nodes_per_second'] * (1 - tolerance):
+            problems.append(f"NPS DROP {label}: {old['nodes_per_second']:.0f} -> "
+                            f"{entry['nodes_per_second']:.0f} nodes/s")
+        if (entry['best_move'], entry['best_score']) != (old['best_move'], old['best_score']):
+            problems.append(f"RESULT   {label}: move {old['best_move']} score {old['best_score']} -> "
+                            f"move {entry['best_move']} score {entry['best_score']}")
+        if entry['nodes'] > old['nodes'] * (1 + tolerance):
+            problems.append(f"NODES    {label}: {old['nodes']} -> {entry['nodes']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the search engines on a fixed corpus")
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES),
+                        default=['minimax', 'alphabeta', 'pvs'])
+    parser.add_argument("--depths", nargs="+", type=int, default=[3, 4, 5, 6])
+    parser.add_argument("--phases", nargs="+", choices=['opening', 'middlegame', 'endgame'],
+                        default=['opening', 'middlegame', 'endgame'])
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before timing")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs, the median is reported")
+    parser.add_argument("--minimax-max-depth", type=int, default=MINIMAX_MAX_DEPTH)
+    parser.add_argument("--sizes", nargs="+", type=parse_size, metavar="ROWSxCOLS",
+                        help="benchmark random positions on these board sizes instead of "
+                             "the 6x7 corpus, e.g. --sizes 6x7 7x8 8x9 9x10")
+    parser.add_argument("--connect", type=int, default=4,
+                        help="pieces in a row needed to win in the size scaling run")
+    parser.add_argument("--size-positions", type=int, default=SCALING_POSITIONS,
+                        help="random positions per board size")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the tracemalloc run used for peak memory")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="flag regressions against a saved benchmark file")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed slowdown before a regression is flagged (fraction)")
+    args = parser.parse_args()
+
+    if args.sizes:
+        for rows, cols in args.sizes:
+            if not 3 <= args.connect <= max(rows, cols):
+                parser.error(f"cannot play connect {args.connect} on a {rows}x{cols} board")
+        positions = scaling_positions(args.sizes, args.connect, args.size_positions)
+    else:
+        positions = [position for position in CORPUS if position['phase'] in args.phases]
+    report = benchmark(args.engines, args.depths, positions, args.warmup, args.repeat,
+                       not args.no_memory, args.minimax_max_depth)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(report['results'])} results to {args.output}")
+    for engine_name, engine_summary in report['summary'].items():
+        print(f"{engine_name:<22} {engine_summary['nodes']:>10} nodes "
+              f"{engine_summary['time']:>8.2f} s {engine_summary['nodes_per_second']:>10.0f} nodes/s")
+        if len(engine_summary['sizes']) > 1:
+            for size, size_summary in engine_summary['sizes'].items():
+                print(f"  {size:<20} {size_summary['nodes']:>10} nodes "
+                      f"{size_summary['time']:>8.2f} s {size_summary['nodes_per_second']:>10.0f} nodes/s")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        problems = compare(report, baseline, args.tolerance)
+        if problems:
+            print(f"\n{len(problems)} regressions against {args.compare}:")
+            for line in problems:
+                print("  " + line)
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
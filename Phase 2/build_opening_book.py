@@ -0,0 +1,97 @@
+import argparse
+import time
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+
+import connect_four_engine as engine
+
+
+# Every position reachable in at most max_plies moves, as move lists, with
+# mirror images counted once
+def enumerate_positions(rows: int, cols: int, connect: int, max_plies: int) -> List[List[int]]:
+    game = engine.BitboardConnectFour(rows, cols, connect)
+    seen = set()
+    positions = []
+
+    def visit(moves: List[int]):
+        key, _ = game.canonical_key()
+        if key in seen or game.is_game_done():
+            return
+        seen.add(key)
+        positions.append(moves.copy())
+
+        if len(moves) == max_plies:
+            return
+        for col in game.get_valid_moves():
+            game.make_move(col)
+            moves.append(col)
+            visit(moves)
+            moves.pop()
+            game.undo_move()
+
+    visit([])
+    return positions
+
+
+# Search one position, returns (canonical key, move on the canonical board,
+# score) for the side to move
+def search_position(task: Tuple[int, int, int, List[int], int, str]) -> Tuple[int, int, int]:
+    rows, cols, connect, moves, depth, algorithm = task
+    game = engine.BitboardConnectFour(rows, cols, connect)
+    for col in moves:
+        game.make_move(col)
+
+    agent_class = engine.PVSAgent if algorithm == 'pvs' else engine.AlphaBetaAgent
+    agent = agent_class(game, max_depth=depth)
+    move, metrics = agent.get_best_move(game, game.current_player)
+    key, mirrored = game.canonical_key()
+    if mirrored:
+        move = game.mirror_move(move)
+    return key, move, metrics['best_score']
+
+
+def build_book(rows: int, cols: int, connect: int, max_plies: int, depth: int,
+               algorithm: str, workers: int) -> Dict[int, Tuple[int, int]]:
+    positions = enumerate_positions(rows, cols, connect, max_plies)
+    print(f"{len(positions)} positions up to {max_plies} plies, searching at depth {depth}")
+
+    tasks = [(rows, cols, connect, moves, depth, algorithm) for moves in positions]
+    entries = {}
+    start = time.perf_counter()
+
+    with Pool(workers) as pool:
+        for done, (key, move, score) in enumerate(pool.imap_unordered(search_position, tasks), 1):
+            entries[key] = (move, score)
+            if done % 100 == 0 or done == len(tasks):
+                elapsed = time.perf_counter() - start
+                print(f"  {done}/{len(tasks)} positions ({elapsed:.0f}s)")
+
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a Connect Four opening book")
+    parser.add_argument("--plies", type=int, default=4,
+                        help="book every position up to this many moves")
+    parser.add_argument("--depth", type=int, default=8,
+                        help="search depth used for each position")
+    parser.add_argument("--algorithm", choices=["alphabeta", "pvs"], default="alphabeta")
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=7)
+    parser.add_argument("--connect", type=int, default=4, help="pieces in a row needed to win")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--output", default="opening_book.bin")
+    args = parser.parse_args()
+    if not 3 <= args.connect <= max(args.rows, args.cols):
+        parser.error(f"cannot play connect {args.connect} on a {args.rows}x{args.cols} board")
+
+    entries = build_book(args.rows, args.cols, args.connect, args.plies, args.depth,
+                         args.algorithm, args.workers)
+    engine.OpeningBook.write(args.output, entries, args.rows, args.cols, args.plies,
+                             args.connect)
+    print(f"Wrote {len(entries)} entries to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3299 @@
+# Connect Four engine: game state, evaluation and search, with no GUI
+# dependencies. "Phase 2 GUI.py" is the tkinter front end for it and
+# engine_protocol.py drives it over stdin/stdout.
+from __future__ import annotations
+
+import atexit
+import math
+import mmap
+import multiprocessing
+import queue
+import random
+import struct
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Tuple, Optional, Dict, Union, Iterator, Callable
+
+
+# NumPy is only needed for array boards and the vectorized evaluation, so
+# it is imported on first use; bitboard searches never load it
+class _LazyNumPy:
+    
+    def __getattr__(self, name):
+        global np
+        import numpy
+        np = numpy
+        return getattr(numpy, name)
+
+
+np = _LazyNumPy()
+
+
+# Zobrist tables shared by every position of the same size
+_ZOBRIST_TABLES = {}
+
+
+def get_zobrist_table(rows: int, cols: int) -> Tuple[List[List[int]], int]:
+    key = (rows, cols)
+    if key not in _ZOBRIST_TABLES:
+        # Fixed seed so keys are the same in every run and every process
+        rng = random.Random(rows * 1000 + cols)
+        pieces = [[0] * (rows * cols)]
+        for _ in range(2):
+            pieces.append([rng.getrandbits(64) for _ in range(rows * cols)])
+        side = rng.getrandbits(64)
+        _ZOBRIST_TABLES[key] = (pieces, side)
+    return _ZOBRIST_TABLES[key]
+
+
+class ConnectFour:
+    
+    # connect is the line length that wins (connect-N variants)
+    def __init__(self, rows=6, cols=7, connect=4):
+        if connect < 3 or connect > max(rows, cols):
+            raise ValueError(f"Cannot play connect {connect} on a {rows}x{cols} board")
+        self.ROWS = rows
+        self.COLS = cols
+        self.CONNECT = connect
+        self.clear_board()
+        self.current_player = 1  # Player 1 starts
+        self.last_move = None
+        self.move_history = []
+        
+        # Winner cache, updated from the lines through each new piece
+        self.winner = None
+        self.winner_history = []
+        
+        # Zobrist hash, updated incrementally by make_move/undo_move, and the
+        # hash of the left-right mirror image of the position
+        self.zobrist_pieces, self.zobrist_side = get_zobrist_table(rows, cols)
+        self.zobrist_key = 0
+        self.mirror_key = 0
+        
+        # Window counts for the evaluator, only kept once enabled
+        self.eval_state = None
+    
+    # Empty storage for the pieces, set up by __init__
+    def clear_board(self):
+        self._board = np.zeros((self.ROWS, self.COLS), dtype=int)
+        
+    def copy(self):
+        new_game = ConnectFour(self.ROWS, self.COLS, self.CONNECT)
+        new_game._board = self.board.copy()
+        new_game.current_player = self.current_player
+        new_game.last_move = self.last_move
+        new_game.move_history = self.move_history.copy()
+        new_game.winner = self.winner
+        new_game.winner_history = self.winner_history.copy()
+        new_game.zobrist_key = self.zobrist_key
+        new_game.mirror_key = self.mirror_key
+        if self.eval_state is not None:
+            new_game.eval_state = self.eval_state.copy()
+        return new_game
+    
+    # Keep the evaluator's window counts up to date on every move from now on
+    def enable_incremental_eval(self):
+        self.eval_state = EvalState(self.ROWS, self.COLS, self.CONNECT)
+        self.eval_state.reset(self.board)
+    
+    @property
+    def board(self) -> np.ndarray:
+        return self._board
+    
+    # Assigning a whole board refreshes the winner cache and hash from scratch
+    @board.setter
+    def board(self, board: np.ndarray):
+        self._board = board
+        self.winner = self.scan_winner()
+        self.zobrist_key = self.compute_zobrist_key()
+        self.mirror_key = self.compute_zobrist_key(mirror=True)
+        if self.eval_state is not None:
+            self.eval_state.reset(board)
+    
+    # Hash of the whole position (or of its mirror image), used to validate
+    # the incremental keys
+    def compute_zobrist_key(self, mirror: bool = False) -> int:
+        board = self.board
+        key = 0
+        for row in range(self.ROWS):
+            for col in range(self.COLS):
+                if board[row][col] != 0:
+                    cell_col = self.COLS - 1 - col if mirror else col
+                    key ^= self.zobrist_pieces[board[row][col]][row * self.COLS + cell_col]
+        if self.current_player == 2:
+            key ^= self.zobrist_side
+        return key
+    
+    # Key shared by the position and its mirror image, and whether this
+    # position is the mirrored one (moves stored under the key are then
+    # mirrored too)
+    def canonical_key(self) -> Tuple[int, bool]:
+        if self.mirror_key < self.zobrist_key:
+            return (self.mirror_key, True)
+        return (self.zobrist_key, False)
+    
+    # Column a move lands in on the mirrored board (and back)
+    def mirror_move(self, col: int) -> int:
+        return self.COLS - 1 - col
+    
+    def get_valid_moves(self) -> List[int]:
+        valid_moves = []
+        for col in range(self.COLS):
+            if self.board[0][col] == 0:  # Top row is empty
+                valid_moves.append(col)
+        return valid_moves
+    
+    # Check if move is valid
+    def is_valid_move(self, col: int) -> bool:
+        if col < 0 or col >= self.COLS:
+            return False
+        return self.board[0][col] == 0
+    
+    # Get the next open row in a column
+    def get_next_open_row(self, col: int) -> Optional[int]:
+        for row in range(self.ROWS - 1, -1, -1):
+            if self.board[row][col] == 0:
+                return row
+        return None
+    
+    # Make a move
+    def make_move(self, col: int, player: Optional[int] = None) -> bool:
+        if not self.is_valid_move(col):
+            return False
+        
+        row = self.get_next_open_row(col)
+        if row is None:
+            return False
+        
+        if player is None:
+            player = self.current_player
+            
+        self.board[row][col] = player
+        self.last_move = (row, col)
+        self.move_history.append(col)
+        self.zobrist_key ^= self.zobrist_pieces[player][row * self.COLS + col] ^ self.zobrist_side
+        self.mirror_key ^= (self.zobrist_pieces[player][row * self.COLS + self.COLS - 1 - col]
+                            ^ self.zobrist_side)
+        if self.eval_state is not None:
+            self.eval_state.add_piece(row * self.COLS + col, player)
+        
+        self.winner_history.append(self.winner)
+        if self.winner is None and self.is_winning_piece(row, col, player):
+            self.winner = player
+        
+        # Switch player
+        self.current_player = 3 - self.current_player  # 1->2, 2->1
+        
+        return True
+    
+    # Undo the last move, returns the column it was played in
+    def undo_move(self) -> Optional[int]:
+        if not self.move_history:
+            return None
+        
+        col = self.move_history.pop()
+        row = self.get_top_row(col)
+        player = self.board[row][col]
+        self.board[row][col] = 0
+        self.winner = self.winner_history.pop()
+        self.zobrist_key ^= self.zobrist_pieces[player][row * self.COLS + col] ^ self.zobrist_side
+        self.mirror_key ^= (self.zobrist_pieces[player][row * self.COLS + self.COLS - 1 - col]
+                            ^ self.zobrist_side)
+        if self.eval_state is not None:
+            self.eval_state.remove_piece(row * self.COLS + col, player)
+        
+        if self.move_history:
+            prev_col = self.move_history[-1]
+            self.last_move = (self.get_top_row(prev_col), prev_col)
+        else:
+            self.last_move = None
+        
+        # Switch player back
+        self.current_player = 3 - self.current_player
+        
+        return col
+    
+    # Get the row of the highest piece in a column
+    def get_top_row(self, col: int) -> int:
+        row = self.get_next_open_row(col)
+        return 0 if row is None else row + 1
+    
+    # Check if the piece at (row, col) completes a line through any direction
+    def is_winning_piece(self, row: int, col: int, player: int) -> bool:
+        board = self.board
+        for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            count = 1
+            for sign in (1, -1):
+                r = row + sign * d_row
+                c = col + sign * d_col
+                while 0 <= r < self.ROWS and 0 <= c < self.COLS and board[r][c] == player:
+                    count += 1
+                    r += sign * d_row
+                    c += sign * d_col
+            if count >= self.CONNECT:
+                return True
+        return False
+    
+    # Columns where player would complete a line by dropping a piece now
+    def winning_moves(self, player: int) -> List[int]:
+        moves = []
+        for col in self.get_valid_moves():
+            if self.is_winning_piece(self.get_next_open_row(col), col, player):
+                moves.append(col)
+        return moves
+    
+    # Threats against player: the opponent's immediate winning columns, and
+    # the columns where player's piece would open a winning cell above it
+    def opponent_threats(self, player: int) -> Tuple[List[int], List[int]]:
+        opponent = 3 - player
+        wins = []
+        under_wins = []
+        for col in self.get_valid_moves():
+            row = self.get_next_open_row(col)
+            if self.is_winning_piece(row, col, opponent):
+                wins.append(col)
+            elif row > 0 and self.is_winning_piece(row - 1, col, opponent):
+                under_wins.append(col)
+        return wins, under_wins
+    
+    # Empty cells, playable or not, where player would complete a line
+    def count_threats(self, player: int) -> int:
+        board = self.board
+        threats = 0
+        for col in range(self.COLS):
+            for row in range(self.get_top_row(col)):
+                if board[row][col] == 0 and self.is_winning_piece(row, col, player):
+                    threats += 1
+        return threats
+    
+    # Check for a winner (cached, kept up to date by make_move/undo_move)
+    def check_winner(self) -> Optional[int]:
+        return self.winner
+    
+    # Full-board scan for a winner, used to validate the cache. One gather
+    # of every window (horizontal ones first, as the cache would see them)
+    def scan_winner(self) -> Optional[int]:
+        windows = self.board.ravel()[get_window_indices(self.ROWS, self.COLS, self.CONNECT)]
+        first = windows[:, 0]
+        complete = (first != 0) & (windows == first[:, np.newaxis]).all(axis=1)
+        if complete.any():
+            return int(first[complete.argmax()])
+        return None
+    
+    # Check if game is done
+    def is_game_done(self) -> bool:
+        # Check for winner
+        if self.winner is not None:
+            return True
+        
+        # Check for draw (top row full)
+        return not (self.board[0] == 0).any()
+    
+    
+    # display board
+    def display(self):
+        print("\n" + " ".join([str(i) for i in range(self.COLS)]))
+        print("-" * (self.COLS * 2 - 1))
+        
+        symbols = {0: ".", 1: "X", 2: "O"}
+        board = self.board
+        for row in range(self.ROWS):
+            print(" ".join([symbols[board[row][col]] for col in range(self.COLS)]))
+        print()
+    
+    # string representation of the board
+    def __str__(self):
+        symbols = {0: ".", 1: "X", 2: "O"}
+        board = self.board
+        result = []
+        for row in range(self.ROWS):
+            result.append(" ".join([symbols[board[row][col]] for col in range(self.COLS)]))
+        return "\n".join(result)
+
+
+# Bit masks shared by every bitboard position of the same size
+_BITBOARD_MASKS = {}
+
+
+def get_bitboard_masks(rows: int, cols: int) -> Dict[str, object]:
+    key = (rows, cols)
+    if key not in _BITBOARD_MASKS:
+        height = rows + 1
+        bottom = [1 << (col * height) for col in range(cols)]
+        top = [1 << (rows - 1 + col * height) for col in range(cols)]
+        column = [((1 << rows) - 1) << (col * height) for col in range(cols)]
+        _BITBOARD_MASKS[key] = {
+            'height': height,
+            'bottom': bottom,
+            'top': top,
+            'column': column,
+            'full': sum(column),
+            'bottom_row': sum(bottom)
+        }
+    return _BITBOARD_MASKS[key]
+
+
+# Empty cells that would complete four (or connect) for the given pieces
+def bitboard_winning_cells(pieces: int, mask: int, height: int, board_mask: int,
+                           connect: int = 4) -> int:
+    if connect != 4:
+        return bitboard_line_cells(pieces, mask, height, board_mask, connect)
+    
+    # Vertical: only three pieces below the cell
+    cells = (pieces << 1) & (pieces << 2) & (pieces << 3)
+    
+    # Horizontal and both diagonals, with the gap anywhere in the four
+    for shift in (height, height - 1, height + 1):
+        pair = (pieces << shift) & (pieces << 2 * shift)
+        cells |= pair & (pieces << 3 * shift)
+        cells |= pair & (pieces >> shift)
+        pair = (pieces >> shift) & (pieces >> 2 * shift)
+        cells |= pair & (pieces << shift)
+        cells |= pair & (pieces >> 3 * shift)
+    
+    return cells & (board_mask ^ mask)
+
+
+# Same for any line length: a cell wins when the k cells before it and the
+# connect - 1 - k cells after it along some direction are all pieces. -1 has
+# every bit set, so it stands for "no cells required".
+def bitboard_line_cells(pieces: int, mask: int, height: int, board_mask: int,
+                        connect: int) -> int:
+    cells = -1
+    for k in range(1, connect):
+        cells &= pieces << k
+    
+    for shift in (height, height - 1, height + 1):
+        before = [-1]
+        after = [-1]
+        for k in range(1, connect):
+            before.append(before[-1] & (pieces << k * shift))
+            after.append(after[-1] & (pieces >> k * shift))
+        for k in range(connect):
+            cells |= before[k] & after[connect - 1 - k]
+    
+    return cells & (board_mask ^ mask)
+
+
+# Left-right mirror image of a bitboard, or of a position + mask key
+def mirror_bitboard(bits: int, cols: int, height: int) -> int:
+    column = (1 << height) - 1
+    mirrored = 0
+    for col in range(cols):
+        mirrored |= ((bits >> (col * height)) & column) << ((cols - 1 - col) * height)
+    return mirrored
+
+
+class BitboardConnectFour(ConnectFour):
+    
+    # Each column takes ROWS + 1 bits, bottom cell first. The spare bit on top
+    # of every column keeps the shifts in has_four from wrapping into the
+    # next column. Python integers have no fixed width, so boards with more
+    # than 64 cells use the same layout.
+    def __init__(self, rows=6, cols=7, connect=4):
+        super().__init__(rows, cols, connect)
+        masks = get_bitboard_masks(rows, cols)
+        self.HEIGHT = masks['height']
+        self.bottom_masks = masks['bottom']
+        self.top_masks = masks['top']
+        self.column_masks = masks['column']
+        self.full_mask = masks['full']
+        self.bottom_row = masks['bottom_row']
+    
+    # The base initializer clears the bitboards instead of a NumPy array
+    def clear_board(self):
+        self.position = 0  # Pieces of the player to move
+        self.mask = 0      # All occupied cells
+    
+    def copy(self):
+        new_game = BitboardConnectFour(self.ROWS, self.COLS, self.CONNECT)
+        new_game.position = self.position
+        new_game.mask = self.mask
+        new_game.current_player = self.current_player
+        new_game.last_move = self.last_move
+        new_game.move_history = self.move_history.copy()
+        new_game.winner = self.winner
+        new_game.winner_history = self.winner_history.copy()
+        new_game.zobrist_key = self.zobrist_key
+        new_game.mirror_key = self.mirror_key
+        if self.eval_state is not None:
+            new_game.eval_state = self.eval_state.copy()
+        return new_game
+    
+    # NumPy view of the position, built on demand for the evaluator and GUI
+    @property
+    def board(self) -> np.ndarray:
+        board = np.zeros((self.ROWS, self.COLS), dtype=int)
+        opponent = 3 - self.current_player
+        for col in range(self.COLS):
+            bit = self.bottom_masks[col]
+            for row in range(self.ROWS - 1, -1, -1):
+                if not self.mask & bit:
+                    break
+                board[row][col] = self.current_player if self.position & bit else opponent
+                bit <<= 1
+        return board
+    
+    @board.setter
+    def board(self, board: np.ndarray):
+        self.position = 0
+        self.mask = 0
+        for col in range(self.COLS):
+            bit = self.bottom_masks[col]
+            for row in range(self.ROWS - 1, -1, -1):
+                if board[row][col] != 0:
+                    self.mask |= bit
+                    if board[row][col] == self.current_player:
+                        self.position |= bit
+                bit <<= 1
+        self.winner = self.scan_winner()
+        self.zobrist_key = self.compute_zobrist_key()
+        self.mirror_key = self.compute_zobrist_key(mirror=True)
+        if self.eval_state is not None:
+            self.eval_state.reset(board)
+    
+    # Window counts built from the bits, without a NumPy board
+    def enable_incremental_eval(self):
+        self.eval_state = EvalState(self.ROWS, self.COLS, self.CONNECT)
+        opponent = 3 - self.current_player
+        for col in range(self.COLS):
+            bit = self.bottom_masks[col]
+            for row in range(self.ROWS - 1, -1, -1):
+                if not self.mask & bit:
+                    break
+                player = self.current_player if self.position & bit else opponent
+                self.eval_state.add_piece(row * self.COLS + col, player)
+                bit <<= 1
+    
+    def get_valid_moves(self) -> List[int]:
+        return [col for col in range(self.COLS) if not self.mask & self.top_masks[col]]
+    
+    # Check if move is valid
+    def is_valid_move(self, col: int) -> bool:
+        if col < 0 or col >= self.COLS:
+            return False
+        return not self.mask & self.top_masks[col]
+    
+    # Get the next open row in a column
+    def get_next_open_row(self, col: int) -> Optional[int]:
+        filled = (self.mask & self.column_masks[col]).bit_count()
+        if filled == self.ROWS:
+            return None
+        return self.ROWS - 1 - filled
+    
+    # Make a move
+    def make_move(self, col: int, player: Optional[int] = None) -> bool:
+        if not self.is_valid_move(col):
+            return False
+        
+        if player is None:
+            player = self.current_player
+        
+        # Adding the bottom bit carries up to the first empty cell of the column
+        move = (self.mask + self.bottom_masks[col]) & self.column_masks[col]
+        opponent_pieces = self.position ^ self.mask
+        
+        # After the switch below, position holds the pieces of the next player
+        if player == self.current_player:
+            player_pieces = self.position | move
+            self.position = opponent_pieces
+        else:
+            self.position = opponent_pieces | move
+            player_pieces = self.position
+        self.mask |= move
+        
+        # Only the mover's pieces can have formed a new four
+        self.winner_history.append(self.winner)
+        if self.winner is None and self.has_four(player_pieces):
+            self.winner = player
+        
+        height = move.bit_length() - 1 - col * self.HEIGHT
+        row = self.ROWS - 1 - height
+        self.last_move = (row, col)
+        self.move_history.append(col)
+        self.zobrist_key ^= self.zobrist_pieces[player][row * self.COLS + col] ^ self.zobrist_side
+        self.mirror_key ^= (self.zobrist_pieces[player][row * self.COLS + self.COLS - 1 - col]
+                            ^ self.zobrist_side)
+        if self.eval_state is not None:
+            self.eval_state.add_piece(row * self.COLS + col, player)
+        
+        # Switch player
+        self.current_player = 3 - self.current_player  # 1->2, 2->1
+        
+        return True
+    
+    # Undo the last move, returns the column it was played in
+    def undo_move(self) -> Optional[int]:
+        if not self.move_history:
+            return None
+        
+        col = self.move_history.pop()
+        height = (self.mask & self.column_masks[col]).bit_length() - 1 - col * self.HEIGHT
+        move = 1 << (height + col * self.HEIGHT)
+        self.mask ^= move
+        self.winner = self.winner_history.pop()
+        
+        # The piece is in position only if it was played for the next player
+        player = self.current_player if self.position & move else 3 - self.current_player
+        row = self.ROWS - 1 - height
+        self.zobrist_key ^= self.zobrist_pieces[player][row * self.COLS + col] ^ self.zobrist_side
+        self.mirror_key ^= (self.zobrist_pieces[player][row * self.COLS + self.COLS - 1 - col]
+                            ^ self.zobrist_side)
+        if self.eval_state is not None:
+            self.eval_state.remove_piece(row * self.COLS + col, player)
+        
+        # Pieces not owned by the next player belong to the player to move
+        self.position = self.mask & ~self.position
+        
+        if self.move_history:
+            prev_col = self.move_history[-1]
+            self.last_move = (self.get_top_row(prev_col), prev_col)
+        else:
+            self.last_move = None
+        
+        # Switch player back
+        self.current_player = 3 - self.current_player
+        
+        return col
+    
+    # Bits of the given player's pieces
+    def player_pieces(self, player: int) -> int:
+        if player == self.current_player:
+            return self.position
+        return self.position ^ self.mask
+    
+    # Empty cells where player would complete a line, as a bitboard
+    def winning_cells(self, player: int) -> int:
+        return bitboard_winning_cells(self.player_pieces(player), self.mask,
+                                      self.HEIGHT, self.full_mask, self.CONNECT)
+    
+    # Columns owning any of the given cells
+    def cell_columns(self, cells: int) -> List[int]:
+        return [col for col in range(self.COLS) if cells & self.column_masks[col]]
+    
+    def winning_moves(self, player: int) -> List[int]:
+        playable = (self.mask + self.bottom_row) & self.full_mask
+        cells = self.winning_cells(player) & playable
+        return self.cell_columns(cells) if cells else []
+    
+    def opponent_threats(self, player: int) -> Tuple[List[int], List[int]]:
+        playable = (self.mask + self.bottom_row) & self.full_mask
+        opponent_wins = self.winning_cells(3 - player)
+        if not opponent_wins:
+            return [], []
+        wins = opponent_wins & playable
+        under_wins = (opponent_wins >> 1) & playable & ~wins
+        return (self.cell_columns(wins) if wins else [],
+                self.cell_columns(under_wins) if under_wins else [])
+    
+    def count_threats(self, player: int) -> int:
+        return self.winning_cells(player).bit_count()
+    
+    # Four aligned pieces in any direction (CONNECT on other variants)
+    def has_four(self, pieces: int) -> bool:
+        if self.CONNECT != 4:
+            return self.has_line(pieces)
+        for shift in (1, self.HEIGHT, self.HEIGHT - 1, self.HEIGHT + 1):
+            pairs = pieces & (pieces >> shift)
+            if pairs & (pairs >> (2 * shift)):
+                return True
+        return False
+    
+    # CONNECT aligned pieces, by doubling runs: a run of length n and its
+    # copy shifted by up to n cells make a run of their combined length
+    def has_line(self, pieces: int) -> bool:
+        for shift in (1, self.HEIGHT, self.HEIGHT - 1, self.HEIGHT + 1):
+            run = pieces
+            length = 1
+            while length < self.CONNECT:
+                step = min(length, self.CONNECT - length)
+                run &= run >> (step * shift)
+                length += step
+            if run:
+                return True
+        return False
+    
+    # Full check of both players' pieces, used to validate the cache
+    def scan_winner(self) -> Optional[int]:
+        if self.has_four(self.position ^ self.mask):
+            return 3 - self.current_player
+        if self.has_four(self.position):
+            return self.current_player
+        return None
+    
+    # Check if game is done
+    def is_game_done(self) -> bool:
+        return self.winner is not None or self.mask == self.full_mask
+
+# Flat board indices of every window of connect cells, as lists and as a
+# NumPy array, shared by boards of the same size and line length
+_WINDOW_CELLS = {}
+_WINDOW_INDICES = {}
+
+
+def get_window_cells(rows: int, cols: int, connect: int = 4) -> List[List[int]]:
+    key = (rows, cols, connect)
+    if key not in _WINDOW_CELLS:
+        n = connect
+        windows = []
+        # Horizontal windows
+        for row in range(rows):
+            for col in range(cols - n + 1):
+                windows.append([(row, col + i) for i in range(n)])
+        # Vertical windows
+        for row in range(rows - n + 1):
+            for col in range(cols):
+                windows.append([(row + i, col) for i in range(n)])
+        # Diagonal windows rising to the right
+        for row in range(n - 1, rows):
+            for col in range(cols - n + 1):
+                windows.append([(row - i, col + i) for i in range(n)])
+        # Diagonal windows falling to the right
+        for row in range(rows - n + 1):
+            for col in range(cols - n + 1):
+                windows.append([(row + i, col + i) for i in range(n)])
+        
+        _WINDOW_CELLS[key] = [[r * cols + c for r, c in window] for window in windows]
+    return _WINDOW_CELLS[key]
+
+
+def get_window_indices(rows: int, cols: int, connect: int = 4) -> np.ndarray:
+    key = (rows, cols, connect)
+    if key not in _WINDOW_INDICES:
+        indices = np.array(get_window_cells(rows, cols, connect),
+                           dtype=np.intp).reshape(-1, connect)
+        indices.setflags(write=False)
+        _WINDOW_INDICES[key] = indices
+    return _WINDOW_INDICES[key]
+
+
+# Windows through each cell, by flat cell index
+_CELL_WINDOWS = {}
+
+
+def get_cell_windows(rows: int, cols: int, connect: int = 4) -> List[List[int]]:
+    key = (rows, cols, connect)
+    if key not in _CELL_WINDOWS:
+        cell_windows = [[] for _ in range(rows * cols)]
+        for window, cells in enumerate(get_window_cells(rows, cols, connect)):
+            for cell in cells:
+                cell_windows[cell].append(window)
+        _CELL_WINDOWS[key] = cell_windows
+    return _CELL_WINDOWS[key]
+
+
+class EvalState:
+    
+    # Window counts maintained move by move, so a position can be scored
+    # without looking at the board. totals[player][n] is the number of
+    # windows holding n pieces of player and none of the opponent.
+    def __init__(self, rows: int, cols: int, connect: int = 4):
+        self.ROWS = rows
+        self.COLS = cols
+        self.CONNECT = connect
+        self.center_col = cols // 2
+        self.cell_windows = get_cell_windows(rows, cols, connect)
+        
+        windows = len(get_window_cells(rows, cols, connect))
+        self.counts = [None, [0] * windows, [0] * windows]
+        self.totals = [None, [windows] + [0] * connect, [windows] + [0] * connect]
+        self.blocked = 0           # Windows holding pieces of both players
+        self.center = [0, 0, 0]    # Pieces in the center column, by player
+    
+    def copy(self):
+        new_state = EvalState.__new__(EvalState)
+        new_state.ROWS = self.ROWS
+        new_state.COLS = self.COLS
+        new_state.CONNECT = self.CONNECT
+        new_state.center_col = self.center_col
+        new_state.cell_windows = self.cell_windows
+        new_state.counts = [None, self.counts[1].copy(), self.counts[2].copy()]
+        new_state.totals = [None, self.totals[1].copy(), self.totals[2].copy()]
+        new_state.blocked = self.blocked
+        new_state.center = self.center.copy()
+        return new_state
+    
+    # Recount everything from a whole board
+    def reset(self, board: np.ndarray):
+        windows = board.ravel()[get_window_indices(self.ROWS, self.COLS, self.CONNECT)]
+        ones = np.count_nonzero(windows == 1, axis=1)
+        twos = np.count_nonzero(windows == 2, axis=1)
+        self.counts = [None, ones.tolist(), twos.tolist()]
+        
+        self.totals = [None, [0] * (self.CONNECT + 1), [0] * (self.CONNECT + 1)]
+        self.blocked = 0
+        for one, two in zip(self.counts[1], self.counts[2]):
+            if two == 0:
+                self.totals[1][one] += 1
+            if one == 0:
+                self.totals[2][two] += 1
+            if one and two:
+                self.blocked += 1
+        
+        center = board[:, self.center_col]
+        self.center = [0, int(np.count_nonzero(center == 1)), int(np.count_nonzero(center == 2))]
+    
+    def add_piece(self, cell: int, player: int):
+        mine = self.counts[player]
+        theirs = self.counts[3 - player]
+        my_totals = self.totals[player]
+        their_totals = self.totals[3 - player]
+        
+        for window in self.cell_windows[cell]:
+            count = mine[window]
+            other = theirs[window]
+            mine[window] = count + 1
+            if other == 0:
+                my_totals[count] -= 1
+                my_totals[count + 1] += 1
+                if count == 0:
+                    their_totals[0] -= 1
+            elif count == 0:
+                # The opponent's window is blocked from now on
+                their_totals[other] -= 1
+                self.blocked += 1
+        
+        if cell % self.COLS == self.center_col:
+            self.center[player] += 1
+    
+    # Exact reverse of add_piece
+    def remove_piece(self, cell: int, player: int):
+        mine = self.counts[player]
+        theirs = self.counts[3 - player]
+        my_totals = self.totals[player]
+        their_totals = self.totals[3 - player]
+        
+        for window in self.cell_windows[cell]:
+            count = mine[window] - 1
+            other = theirs[window]
+            mine[window] = count
+            if other == 0:
+                my_totals[count + 1] -= 1
+                my_totals[count] += 1
+                if count == 0:
+                    their_totals[0] += 1
+            elif count == 0:
+                their_totals[other] += 1
+                self.blocked -= 1
+        
+        if cell % self.COLS == self.center_col:
+            self.center[player] -= 1
+    
+    # Same totals as Evaluator.count_windows
+    def count_windows(self, player: int) -> Dict[str, int]:
+        totals = self.totals[player]
+        n = self.CONNECT
+        return {
+            'four': totals[n],
+            'three': totals[n - 1],
+            'two': totals[n - 2],
+            'blocked': self.blocked
+        }
+
+
+class Evaluator:
+    
+    # Points per open three, open two and center-column piece, and per empty
+    # cell that would complete four (threats are scored by evaluate_state only).
+    # On connect-N boards "three" and "two" are windows one and two pieces
+    # short of a line.
+    DEFAULT_WEIGHTS = {'three': 10, 'two': 2, 'center': 3, 'threat': 0}
+    
+    # Longest line scored through the window table, which has 3^connect
+    # entries; longer lines are scored by counting pieces
+    MAX_TABLE_CONNECT = 10
+    
+    def __init__(self, game: ConnectFour, weights: Optional[Dict[str, int]] = None):
+        self.game = game
+        self.ROWS = game.ROWS
+        self.COLS = game.COLS
+        self.CONNECT = game.CONNECT
+        self._window_indices = None
+        self._window_table = None
+        
+        self.weights = dict(self.DEFAULT_WEIGHTS)
+        self.set_weights(weights or {})
+        
+        # Mirror images score the same only with a single center column
+        self.symmetric = self.COLS % 2 == 1
+    
+    # Change some or all of the weights. Only the window table depends on
+    # them, and it is rebuilt on the next evaluation.
+    def set_weights(self, weights: Dict[str, int]):
+        weights = dict(weights)
+        unknown = set(weights) - set(self.DEFAULT_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Unknown evaluation weights: {sorted(unknown)}")
+        self.weights.update(weights)
+        self.three_weight = self.weights['three']
+        self.two_weight = self.weights['two']
+        self.center_weight = self.weights['center']
+        self.threat_weight = self.weights['threat']
+        self._window_table = None
+    
+    # Built on first use, so evaluating from window counts needs no NumPy
+    @property
+    def window_indices(self) -> np.ndarray:
+        if self._window_indices is None:
+            self._window_indices = get_window_indices(self.ROWS, self.COLS, self.CONNECT)
+        return self._window_indices
+    
+    # Every window state by its base-3 code: cell values 0/1/2 are the digits,
+    # the window's first cell the lowest. Returns the powers of 3 that make
+    # the codes, the window scores from player 1's side (open threes and
+    # twos of player 1 minus those of player 2) and the player holding a
+    # complete line in the window, 0 for none.
+    @property
+    def window_table(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self._window_table is None:
+            n = self.CONNECT
+            powers = 3 ** np.arange(n)
+            digits = np.arange(3 ** n)[:, np.newaxis] // powers % 3
+            ones = np.count_nonzero(digits == 1, axis=1)
+            twos = np.count_nonzero(digits == 2, axis=1)
+            
+            points = np.zeros(n + 1, dtype=int)
+            points[n - 1] = self.three_weight
+            points[n - 2] = self.two_weight
+            scores = np.where(twos == 0, points[ones], 0) - np.where(ones == 0, points[twos], 0)
+            lines = np.where(ones == n, 1, np.where(twos == n, 2, 0))
+            self._window_table = (powers, scores, lines)
+        return self._window_table
+    
+    # Window line scores (player 1's side) and complete lines of a stack of
+    # boards (N, rows, cols), shapes (N,) and (N, windows)
+    def window_lookup(self, boards: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        powers, scores, lines = self.window_table
+        codes = boards.reshape(len(boards), -1)[:, self.window_indices] @ powers
+        return scores[codes].sum(axis=1), lines[codes]
+    
+    # Pieces of player and opponent in every window, shape (2, windows)
+    def window_piece_counts(self, board: np.ndarray, player: int) -> np.ndarray:
+        windows = board.ravel()[self.window_indices]
+        return np.stack((np.count_nonzero(windows == player, axis=1),
+                         np.count_nonzero(windows == 3 - player, axis=1)))
+    
+    # Window pattern totals for player (row 0) and opponent (row 1)
+    def window_patterns(self, piece_counts: np.ndarray) -> Dict[str, np.ndarray]:
+        n = self.CONNECT
+        empty_counts = n - piece_counts.sum(axis=0)
+        return {
+            'four': np.count_nonzero(piece_counts == n, axis=1),
+            'three': np.count_nonzero((piece_counts == n - 1) & (empty_counts == 1), axis=1),
+            'two': np.count_nonzero((piece_counts == n - 2) & (empty_counts == 2), axis=1),
+            'blocked': np.count_nonzero(piece_counts.all(axis=0))
+        }
+    
+    def count_windows(self, board: np.ndarray, player: int) -> Dict[str, int]:
+        patterns = self.window_patterns(self.window_piece_counts(board, player))
+        return {
+            'four': int(patterns['four'][0]),      # Four in a row (win)
+            'three': int(patterns['three'][0]),    # Three with one empty
+            'two': int(patterns['two'][0]),        # Two with two empty
+            'blocked': int(patterns['blocked'])    # Opponent can block
+        }
+    
+    def evaluate_center_control(self, board: np.ndarray, player: int) -> int:
+        center_col = self.COLS // 2
+        center_array = board[:, center_col]
+        return int(np.count_nonzero(center_array == player)) * self.center_weight
+    
+    def evaluate_position(self, board: np.ndarray, player: int) -> float:
+        if self.CONNECT <= self.MAX_TABLE_CONNECT:
+            line_scores, lines = self.window_lookup(board[np.newaxis])
+            if lines.any():
+                return 1000 if (lines == player).any() else -1000
+            score = int(line_scores[0]) if player == 1 else -int(line_scores[0])
+            
+            # Center control bonus
+            score += self.evaluate_center_control(board, player)
+            score -= self.evaluate_center_control(board, 3 - player)
+            return score
+        
+        # One gather scores both players
+        patterns = self.window_patterns(self.window_piece_counts(board, player))
+        four, three, two = patterns['four'], patterns['three'], patterns['two']
+        
+        # Check for terminal state first
+        if four[0]:
+            return 1000  # Win
+        elif four[1]:
+            return -1000  # Loss
+        
+        # Non-terminal evaluation
+        score = (int(three[0] - three[1]) * self.three_weight
+                 + int(two[0] - two[1]) * self.two_weight)
+        
+        # Center control bonus
+        score += self.evaluate_center_control(board, player)
+        score -= self.evaluate_center_control(board, 3 - player)
+        
+        return score
+    
+    # Score a stack of boards (N, rows, cols) in one pass. player is one
+    # player for every board or an array with one player per board.
+    def evaluate_batch(self, boards: np.ndarray, player: Union[int, np.ndarray]) -> np.ndarray:
+        # int8 keeps the (N, windows, connect) gather small for large stacks
+        n = self.CONNECT
+        boards = np.asarray(boards, dtype=np.int8)
+        count = len(boards)
+        players = np.broadcast_to(np.asarray(player), (count,)).reshape(count, 1)
+        opponents = 3 - players
+        
+        if n <= self.MAX_TABLE_CONNECT:
+            line_scores, lines = self.window_lookup(boards)
+            score = np.where(players[:, 0] == 1, line_scores, -line_scores)
+            my_lines = (lines == players).any(axis=1)
+            their_lines = (lines == opponents).any(axis=1)
+        else:
+            # (N, windows, connect) gather, then pieces per window for both sides
+            windows = boards.reshape(count, -1)[:, self.window_indices]
+            mine = np.count_nonzero(windows == players[:, :, np.newaxis], axis=2)
+            theirs = np.count_nonzero(windows == opponents[:, :, np.newaxis], axis=2)
+            
+            open_mine = np.where(theirs == 0, mine, 0)
+            open_theirs = np.where(mine == 0, theirs, 0)
+            score = (np.count_nonzero(open_mine == n - 1, axis=1)
+                     - np.count_nonzero(open_theirs == n - 1, axis=1)) * self.three_weight
+            score += (np.count_nonzero(open_mine == n - 2, axis=1)
+                      - np.count_nonzero(open_theirs == n - 2, axis=1)) * self.two_weight
+            my_lines = (mine == n).any(axis=1)
+            their_lines = (theirs == n).any(axis=1)
+        
+        # Center control bonus
+        center = boards[:, :, self.COLS // 2]
+        score += (np.count_nonzero(center == players, axis=1)
+                  - np.count_nonzero(center == opponents, axis=1)) * self.center_weight
+        
+        # Terminal boards, a win for player checked first as in evaluate_position
+        score = np.where(their_lines, -1000, score)
+        score = np.where(my_lines, 1000, score)
+        return score
+    
+    # Score a game, read straight from its window counts when it keeps them
+    def evaluate_state(self, game_state: ConnectFour, player: int) -> float:
+        state = game_state.eval_state
+        if state is None:
+            score = self.evaluate_position(game_state.board, player)
+            if self.threat_weight and game_state.winner is None:
+                score += self.evaluate_threats(game_state, player)
+            return score
+        
+        # Totals run up to CONNECT pieces, so they are read from the end:
+        # [-1] complete lines, [-2] one piece short, [-3] two pieces short
+        opponent = 3 - player
+        mine = state.totals[player]
+        theirs = state.totals[opponent]
+        if mine[-1]:
+            return 1000  # Win
+        elif theirs[-1]:
+            return -1000  # Loss
+        
+        score = ((mine[-2] - theirs[-2]) * self.three_weight
+                 + (mine[-3] - theirs[-3]) * self.two_weight)
+        score += (state.center[player] - state.center[opponent]) * self.center_weight
+        if self.threat_weight:
+            score += self.evaluate_threats(game_state, player)
+        return score
+    
+    # Weighted difference in cells where each side would complete a line
+    def evaluate_threats(self, game_state: ConnectFour, player: int) -> int:
+        return (game_state.count_threats(player)
+                - game_state.count_threats(3 - player)) * self.threat_weight
+
+# Raised inside a search when its time budget runs out
+class SearchTimeout(Exception):
+    pass
+
+
+class TranspositionTable:
+    
+    # Bound types of a stored score
+    EXACT = 0
+    LOWER_BOUND = 1
+    UPPER_BOUND = 2
+    
+    # Approximate memory held by one filled slot (list slot, entry tuple, key)
+    ENTRY_BYTES = 150
+    
+    def __init__(self, max_memory_mb: float = 16, replacement: str = 'depth'):
+        if replacement not in ('depth', 'always'):
+            raise ValueError(f"Unknown replacement policy: {replacement}")
+        
+        self.size = max(1, int(max_memory_mb * 1024 * 1024) // self.ENTRY_BYTES)
+        self.replacement = replacement
+        self.entries = [None] * self.size
+        self.used = 0
+        
+        # Statistics
+        self.probes = 0
+        self.hits = 0
+    
+    def clear(self):
+        self.entries = [None] * self.size
+        self.used = 0
+        self.reset_stats()
+    
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+    
+    # Entries are (key, depth, score, flag, best_move) tuples
+    def probe(self, key: int) -> Optional[Tuple[int, int, float, int, Optional[int]]]:
+        self.probes += 1
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+    
+    # Stored best move for a position, without touching the statistics
+    def get_move(self, key: int) -> Optional[int]:
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry[4]
+        return None
+    
+    def store(self, key: int, depth: int, score: float, flag: int, best_move: Optional[int]):
+        index = key % self.size
+        entry = self.entries[index]
+        
+        if entry is None:
+            self.used += 1
+        elif self.replacement == 'depth' and entry[0] != key and entry[1] > depth:
+            # Depth-preferred: keep the deeper result of a different position
+            return
+        
+        self.entries[index] = (key, depth, score, flag, best_move)
+    
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            'tt_probes': self.probes,
+            'tt_hits': self.hits,
+            'tt_hit_rate': self.hits / self.probes if self.probes else 0.0,
+            'tt_occupancy': self.used / self.size
+        }
+
+
+class OpeningBook:
+    
+    # Book file: a header followed by (key, move, score) entries sorted by
+    # the position's canonical Zobrist key, with the move given on the
+    # canonical board. The file is memory-mapped and searched in place, so a
+    # large book costs almost no resident memory.
+    MAGIC = b'C4OB'
+    VERSION = 3
+    HEADER = struct.Struct('<4sHBBBBI')  # magic, version, rows, cols, connect, max plies, count
+    ENTRY = struct.Struct('<Qbi')       # key, move, score (side to move)
+    
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        if len(self.data) < self.HEADER.size:
+            raise ValueError(f"{path} is not an opening book")
+        magic, version, rows, cols, connect, max_plies, count = self.HEADER.unpack_from(self.data, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"{path} is not a version {self.VERSION} opening book")
+        if len(self.data) != self.HEADER.size + count * self.ENTRY.size:
+            raise ValueError(f"{path} is truncated")
+        
+        self.ROWS = rows
+        self.COLS = cols
+        self.CONNECT = connect
+        self.max_plies = max_plies
+        self.count = count
+    
+    def close(self):
+        self.data.close()
+    
+    def __len__(self):
+        return self.count
+    
+    # Binary search for the position, returns (move, score) or None
+    def lookup(self, game_state: ConnectFour) -> Optional[Tuple[int, int]]:
+        if (game_state.ROWS != self.ROWS or game_state.COLS != self.COLS
+                or game_state.CONNECT != self.CONNECT
+                or len(game_state.move_history) > self.max_plies):
+            return None
+        
+        key, mirrored = game_state.canonical_key()
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            entry_key, move, score = self.ENTRY.unpack_from(
+                self.data, self.HEADER.size + mid * self.ENTRY.size)
+            if entry_key < key:
+                low = mid + 1
+            elif entry_key > key:
+                high = mid
+            else:
+                if mirrored:
+                    move = game_state.mirror_move(move)
+                return (move, score) if game_state.is_valid_move(move) else None
+        return None
+    
+    # Write a book from {canonical key: (move on the canonical board, score)}
+    @classmethod
+    def write(cls, path: str, entries: Dict[int, Tuple[int, int]],
+              rows: int, cols: int, max_plies: int, connect: int = 4):
+        with open(path, 'wb') as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, rows, cols, connect,
+                                    max_plies, len(entries)))
+            for key in sorted(entries):
+                move, score = entries[key]
+                f.write(cls.ENTRY.pack(key, move, int(score)))
+
+
+# Static move order for a board width, center column first
+def get_center_order(cols: int) -> List[int]:
+    center_col = cols // 2
+    return sorted(range(cols), key=lambda col: abs(col - center_col))
+
+
+class MoveOrderer:
+    
+    # Killer moves per ply and a history table learned from beta cutoffs,
+    # on top of the static center-first order
+    def __init__(self, cols: int, max_ply: int, dynamic: bool = True):
+        self.center_order = get_center_order(cols)
+        self.max_ply = max_ply
+        self.dynamic = dynamic
+        
+        self.killers = [[None, None] for _ in range(max_ply + 1)]
+        self.history = [[0] * cols for _ in range(3)]  # [player][col]
+        
+        # Statistics
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+    
+    # Called before each root search: killers belong to the old root's plies
+    # and history is halved so recent cutoffs weigh more
+    def new_search(self):
+        self.killers = [[None, None] for _ in range(self.max_ply + 1)]
+        for player_history in self.history:
+            for col in range(len(player_history)):
+                player_history[col] //= 2
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+    
+    # Hash/PV move first, then killers, then by history and center distance
+    def order_moves(self, valid_moves: List[int], ply: int,
+                    hash_move: Optional[int], player: int) -> List[int]:
+        moves = [col for col in self.center_order if col in valid_moves]
+        
+        if self.dynamic:
+            # Sorting is stable, so equal history keeps the center order
+            moves.sort(key=self.history[player].__getitem__, reverse=True)
+            for killer in reversed(self.killers[ply]):
+                if killer is not None and killer != moves[0] and killer in moves:
+                    moves.remove(killer)
+                    moves.insert(0, killer)
+        
+        if hash_move is not None and hash_move != moves[0] and hash_move in moves:
+            moves.remove(hash_move)
+            moves.insert(0, hash_move)
+        
+        return moves
+    
+    def record_cutoff(self, player: int, move: int, ply: int, depth: int, move_index: int):
+        self.cutoffs += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+        
+        if self.dynamic:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+            self.history[player][move] += depth * depth
+    
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            'first_move_cutoffs': self.first_move_cutoffs,
+            'first_move_cutoff_rate': (self.first_move_cutoffs / self.cutoffs
+                                       if self.cutoffs else 0.0)
+        }
+
+
+class EndgameSolver:
+    
+    # Exact win/draw/loss search on raw bitboards for positions with few
+    # empty cells. Scores follow the usual solver convention: a positive
+    # score means the side to move wins, and it is larger the sooner the win
+    # comes ((cells + 1 - moves) // 2 for a win with the very next move).
+    
+    # Fewest empty cells at which cache keys are shared with the mirror image
+    MIRROR_MIN_EMPTY = 12
+    
+    def __init__(self, rows: int, cols: int, connect: int = 4,
+                 max_cache_entries: int = 1 << 18):
+        masks = get_bitboard_masks(rows, cols)
+        self.ROWS = rows
+        self.COLS = cols
+        self.CONNECT = connect
+        self.HEIGHT = masks['height']
+        self.bottom_masks = masks['bottom']
+        self.top_masks = masks['top']
+        self.column_masks = masks['column']
+        self.board_mask = masks['full']
+        self.bottom_row = sum(masks['bottom'])
+        self.cells = rows * cols
+        self.center_order = get_center_order(cols)
+        
+        # Upper bounds by position key, cleared when it fills up
+        self.cache = {}
+        self.max_cache_entries = max_cache_entries
+        self.nodes = 0
+        
+        # Polled every 1024 nodes; returning True aborts with SearchTimeout
+        self.should_stop = None
+    
+    # Best move and exact score for the side to move
+    def solve(self, game_state: ConnectFour) -> Tuple[int, int]:
+        if isinstance(game_state, BitboardConnectFour):
+            position, mask = game_state.position, game_state.mask
+        else:
+            converted = BitboardConnectFour(game_state.ROWS, game_state.COLS, game_state.CONNECT)
+            converted.current_player = game_state.current_player
+            converted.board = game_state.board
+            position, mask = converted.position, converted.mask
+        
+        self.nodes = 0
+        moves = mask.bit_count()
+        alpha = -((self.cells - moves) // 2)
+        beta = (self.cells + 1 - moves) // 2
+        
+        # Immediate win
+        own_wins = bitboard_winning_cells(position, mask, self.HEIGHT, self.board_mask,
+                                          self.CONNECT)
+        for col in self.center_order:
+            if not mask & self.top_masks[col]:
+                move = (mask + self.bottom_masks[col]) & self.column_masks[col]
+                if move & own_wins:
+                    return col, beta
+        
+        best_move = None
+        for col in self.order_moves(position, mask, self.possible_moves(mask)):
+            move = (mask + self.bottom_masks[col]) & self.column_masks[col]
+            score = -self.negamax(position ^ mask, mask | move, moves + 1, -beta, -alpha)
+            if best_move is None or score > alpha:
+                alpha = score
+                best_move = col
+        
+        return best_move, alpha
+    
+    def possible_moves(self, mask: int) -> int:
+        return (mask + self.bottom_row) & self.board_mask
+    
+    # Columns ordered by how many winning cells the move creates, then center
+    def order_moves(self, position: int, mask: int, playable: int) -> List[int]:
+        scored = []
+        for col in self.center_order:
+            move = playable & self.column_masks[col]
+            if move:
+                wins = bitboard_winning_cells(position | move, mask | move,
+                                              self.HEIGHT, self.board_mask, self.CONNECT)
+                scored.append((-wins.bit_count(), len(scored), col))
+        scored.sort()
+        return [col for _, _, col in scored]
+    
+    def negamax(self, position: int, mask: int, moves: int, alpha: int, beta: int) -> int:
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and self.should_stop is not None and self.should_stop():
+            raise SearchTimeout()
+        
+        possible = self.possible_moves(mask)
+        
+        # Side to move wins right away
+        if possible & bitboard_winning_cells(position, mask, self.HEIGHT, self.board_mask,
+                                             self.CONNECT):
+            return (self.cells + 1 - moves) // 2
+        if moves >= self.cells - 1:
+            return 0  # Draw: the last cell cannot win
+        
+        # Opponent threats: two playable ones lose, one must be blocked, and
+        # playing right under one hands it over
+        opponent_wins = bitboard_winning_cells(position ^ mask, mask, self.HEIGHT,
+                                               self.board_mask, self.CONNECT)
+        forced = possible & opponent_wins
+        if forced:
+            if forced & (forced - 1):
+                return -((self.cells - moves) // 2)
+            possible = forced
+        possible &= ~(opponent_wins >> 1)
+        if not possible:
+            return -((self.cells - moves) // 2)
+        
+        # Tight bounds: no win before our next-but-one move, no loss before
+        # the opponent's next-but-one move
+        min_score = -((self.cells - 2 - moves) // 2)
+        if alpha < min_score:
+            alpha = min_score
+            if alpha >= beta:
+                return alpha
+        max_score = (self.cells - 1 - moves) // 2
+        
+        # A position and its mirror image share one entry, where the subtree
+        # is big enough to be worth the mirroring
+        key = position + mask
+        if self.cells - moves >= self.MIRROR_MIN_EMPTY:
+            mirrored = mirror_bitboard(key, self.COLS, self.HEIGHT)
+            if mirrored < key:
+                key = mirrored
+        cached = self.cache.get(key)
+        if cached is not None and cached < max_score:
+            max_score = cached
+        if beta > max_score:
+            beta = max_score
+            if alpha >= beta:
+                return beta
+        
+        for col in self.order_moves(position, mask, possible):
+            move = (mask + self.bottom_masks[col]) & self.column_masks[col]
+            score = -self.negamax(position ^ mask, mask | move, moves + 1, -beta, -alpha)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        
+        if len(self.cache) >= self.max_cache_entries:
+            self.cache.clear()
+        self.cache[key] = alpha
+        return alpha
+    
+    # Human readable result, counting the moves of the side that wins
+    def describe_score(self, score: int, moves: int) -> str:
+        if score > 0:
+            return f"win in {(self.cells + 1 - moves) // 2 - score + 1}"
+        if score < 0:
+            return f"loss in {(self.cells - moves) // 2 + score + 1}"
+        return "draw"
+
+
+class SearchInstrumentation:
+    
+    # Optional statistics for an agent's searches: nodes and cutoffs per ply,
+    # branching factors, cache hit rates, time spent in move generation,
+    # evaluation and win checks, and a progress callback called with
+    # (depth, score, pv, nodes) after each completed iteration. Attaching it
+    # swaps counting and timing wrappers in for the agent's own methods, so
+    # an agent without one runs exactly the plain search code.
+    
+    # Timing bucket of each wrapped method of the searched position
+    POSITION_TIMERS = {
+        'get_valid_moves': 'move_generation',
+        'check_winner': 'win_checks',
+        'winning_moves': 'win_checks',
+        'opponent_threats': 'win_checks',
+    }
+    EVALUATOR_TIMERS = ('evaluate_position', 'evaluate_state', 'evaluate_batch')
+    
+    # collect_stats=False keeps only the progress callback, at no search cost
+    def __init__(self, progress_callback=None, collect_stats: bool = True):
+        self.progress_callback = progress_callback
+        self.collect_stats = collect_stats
+        self.reset()
+    
+    def reset(self):
+        self.ply_nodes = {}
+        self.ply_cutoffs = {}
+        self.ply_first_cutoffs = {}
+        self.times = {'move_generation': 0.0, 'evaluation': 0.0, 'win_checks': 0.0}
+        self.calls = dict.fromkeys(self.times, 0)
+        self.iterations = []
+        self.timing = False
+        self.start_time = time.perf_counter()
+    
+    # Wrap the agent's recursive search, evaluator and move orderer, where it
+    # has them
+    def attach(self, agent):
+        if not self.collect_stats:
+            return
+        if agent.SEARCH_METHOD is not None:
+            search = getattr(type(agent), agent.SEARCH_METHOD).__get__(agent)
+            setattr(agent, agent.SEARCH_METHOD, self.counted(agent, search))
+        evaluator = getattr(agent, 'evaluator', None)
+        if evaluator is not None:
+            for name in self.EVALUATOR_TIMERS:
+                method = getattr(evaluator, name)
+                setattr(evaluator, name, self.timed('evaluation', method))
+        
+        move_orderer = getattr(agent, 'move_orderer', None)
+        if move_orderer is not None:
+            move_orderer.order_moves = self.timed('move_generation', move_orderer.order_moves)
+            move_orderer.record_cutoff = self.cutoff_counter(move_orderer.record_cutoff)
+    
+    # Put the agent's own methods back
+    def detach(self, agent):
+        if agent.SEARCH_METHOD is not None:
+            agent.__dict__.pop(agent.SEARCH_METHOD, None)
+        evaluator = getattr(agent, 'evaluator', None)
+        if evaluator is not None:
+            for name in self.EVALUATOR_TIMERS:
+                evaluator.__dict__.pop(name, None)
+        move_orderer = getattr(agent, 'move_orderer', None)
+        if move_orderer is not None:
+            move_orderer.__dict__.pop('order_moves', None)
+            move_orderer.__dict__.pop('record_cutoff', None)
+    
+    # Called with the agent's private copy of the position before a search
+    def start_search(self, position: ConnectFour):
+        self.reset()
+        if not self.collect_stats:
+            return
+        for name, bucket in self.POSITION_TIMERS.items():
+            setattr(position, name, self.timed(bucket, getattr(position, name)))
+    
+    def counted(self, agent, search):
+        def wrapper(game_state, depth, *args):
+            # Iterative deepening moves the root depth, minimax has a fixed one
+            ply = getattr(agent, 'search_depth', agent.max_depth) - depth
+            self.ply_nodes[ply] = self.ply_nodes.get(ply, 0) + 1
+            return search(game_state, depth, *args)
+        return wrapper
+    
+    def cutoff_counter(self, record_cutoff):
+        def wrapper(player, move, ply, depth, move_index):
+            self.ply_cutoffs[ply] = self.ply_cutoffs.get(ply, 0) + 1
+            if move_index == 0:
+                self.ply_first_cutoffs[ply] = self.ply_first_cutoffs.get(ply, 0) + 1
+            return record_cutoff(player, move, ply, depth, move_index)
+        return wrapper
+    
+    # Time spent in func goes into bucket; calls nested inside another timed
+    # call are left to the outer one
+    def timed(self, bucket: str, func):
+        def wrapper(*args, **kwargs):
+            if self.timing:
+                return func(*args, **kwargs)
+            self.timing = True
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.times[bucket] += time.perf_counter() - start
+                self.calls[bucket] += 1
+                self.timing = False
+        return wrapper
+    
+    # A completed iteration; nodes is the search total so far
+    def iteration_done(self, depth: int, score: float, pv: List[int], nodes: int):
+        self.iterations.append({'depth': depth, 'score': score, 'pv': list(pv),
+                                'nodes': nodes,
+                                'time': time.perf_counter() - self.start_time})
+        if self.progress_callback is not None:
+            self.progress_callback(depth, score, pv, nodes)
+    
+    # Nodes, cutoffs and branching factors per ply of the search tree
+    def ply_report(self) -> Dict:
+        report = {}
+        last_ply = max(self.ply_nodes, default=-1)
+        ply_nodes = [self.ply_nodes.get(ply, 0) for ply in range(last_ply + 1)]
+        report['ply_nodes'] = ply_nodes
+        report['ply_cutoffs'] = [self.ply_cutoffs.get(ply, 0) for ply in range(last_ply + 1)]
+        report['ply_first_move_cutoffs'] = [self.ply_first_cutoffs.get(ply, 0)
+                                            for ply in range(last_ply + 1)]
+        
+        # Nodes at each ply per node one ply up, and b with b^depth = nodes
+        # for the deepest iteration
+        report['ply_branching'] = [ply_nodes[ply + 1] / ply_nodes[ply]
+                                   for ply in range(last_ply) if ply_nodes[ply]]
+        if self.iterations:
+            last = self.iterations[-1]
+            nodes = last['nodes'] - (self.iterations[-2]['nodes']
+                                     if len(self.iterations) > 1 else 0)
+            report['effective_branching_factor'] = (nodes ** (1 / last['depth'])
+                                                    if last['depth'] > 0 and nodes > 0 else 0.0)
+        
+        # Node growth from one iteration to the next
+        report['iteration_branching'] = []
+        previous = 0
+        previous_size = 0
+        for iteration in self.iterations:
+            size = iteration['nodes'] - previous
+            if previous_size:
+                report['iteration_branching'].append(size / previous_size)
+            previous, previous_size = iteration['nodes'], size
+        
+        return report
+    
+    def report(self, agent) -> Dict:
+        report = {'iterations': self.iterations}
+        if not self.collect_stats:
+            return report
+        
+        # MCTS has no recursive search to take per-ply statistics from
+        if agent.SEARCH_METHOD is not None:
+            report.update(self.ply_report())
+        
+        cache = {}
+        tt = getattr(agent, 'tt', None)
+        if tt is not None:
+            cache.update(tt.get_stats())
+        solver = getattr(agent, 'endgame_solver', None)
+        if solver is not None:
+            cache['solver_cache_entries'] = len(solver.cache)
+        report['cache'] = cache
+        
+        # Wrapper overhead lands in the buckets too, so compare them with
+        # each other rather than with an uninstrumented search
+        elapsed = time.perf_counter() - self.start_time
+        report['time_split'] = dict(self.times, total=elapsed,
+                                    other=max(0.0, elapsed - sum(self.times.values())))
+        report['timed_calls'] = dict(self.calls)
+        return report
+
+
+# Base of the agents SearchInstrumentation can attach to
+class InstrumentedAgent:
+    
+    # Attach statistics collection, or turn it off with None
+    def set_instrumentation(self, instrumentation: Optional[SearchInstrumentation]):
+        if self.instrumentation is not None:
+            self.instrumentation.detach(self)
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            instrumentation.attach(self)
+
+
+class MinimaxAgent(InstrumentedAgent):
+    
+    # Recursive search method counted by SearchInstrumentation
+    SEARCH_METHOD = 'minimax'
+    
+    def __init__(self, game: ConnectFour, max_depth: int = 6,
+                 eval_weights: Optional[Dict[str, int]] = None,
+                 instrumentation: Optional[SearchInstrumentation] = None):
+        self.game = game
+        self.max_depth = max_depth
+        self.evaluator = Evaluator(game, eval_weights)
+        self.center_order = get_center_order(game.COLS)
+        
+        # Set from another thread to abort the running search
+        self.stop_requested = False
+        
+        self.instrumentation = None
+        self.set_instrumentation(instrumentation)
+        
+        # Performance metrics
+        self.nodes_explored = 0
+        self.max_depth_reached = 0
+        self.start_time = 0
+        self.end_time = 0
+        
+    # Reset performance metrics
+    def reset_metrics(self):
+        self.nodes_explored = 0
+        self.max_depth_reached = 0
+        self.start_time = 0
+        self.end_time = 0
+    
+    def minimax(self, game_state: ConnectFour, depth: int, 
+                maximizing_player: bool, player: int) -> Tuple[float, Optional[int]]:
+
+        # Update metrics
+        self.nodes_explored += 1
+        self.max_depth_reached = max(self.max_depth_reached, 
+                                     self.max_depth - depth)
+        
+        # Check the stop flag every 64 nodes
+        if self.nodes_explored & 63 == 0 and self.stop_requested:
+            raise SearchTimeout()
+        
+        # Terminal state (the winner is cached on the position)
+        winner = game_state.check_winner()
+        if winner == player:
+            return (1000000, None)  # Win
+        elif winner is not None:
+            return (-1000000, None)  # Loss
+        
+        # Get valid moves
+        valid_moves = game_state.get_valid_moves()
+        if len(valid_moves) == 0:
+            return (0, None)  # Draw
+        
+        # Depth limit reached, evaluate non-terminal position
+        if depth == 0:
+            score = self.evaluator.evaluate_position(game_state.board, player)
+            return (score, None)
+        
+        # Order moves (center column first for better performance)
+        valid_moves = [col for col in self.center_order if col in valid_moves]
+        
+        if maximizing_player:
+            # MAX player (trying to maximize score)
+            max_eval = float('-inf')
+            best_move = valid_moves[0]
+            
+            for move in valid_moves:
+                game_state.make_move(move)
+                
+                # Recursive call
+                eval_score, _ = self.minimax(game_state, depth - 1, False, player)
+                
+                game_state.undo_move()
+                
+                if eval_score > max_eval:
+                    max_eval = eval_score
+                    best_move = move
+            
+            return (max_eval, best_move)
+        
+        else:
+            # MIN player (trying to minimize score)
+            min_eval = float('inf')
+            best_move = valid_moves[0]
+            
+            for move in valid_moves:
+                game_state.make_move(move)
+                
+                # Recursive call
+                eval_score, _ = self.minimax(game_state, depth - 1, True, player)
+                
+                game_state.undo_move()
+                
+                if eval_score < min_eval:
+                    min_eval = eval_score
+                    best_move = move
+            
+            return (min_eval, best_move)
+    
+    def set_eval_weights(self, weights: Dict[str, int]):
+        self.evaluator.set_weights(weights)
+    
+    # Abort the running search from another thread
+    def stop(self):
+        self.stop_requested = True
+    
+    def get_best_move(self, game_state: ConnectFour, player: int) -> Tuple[int, Dict]:
+        self.reset_metrics()
+        self.start_time = time.time()
+        
+        # Search a private copy with make/undo so the caller's game is untouched
+        position = game_state.copy()
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            instrumentation.start_search(position)
+        
+        # The root maximizes when it is the searching player's turn
+        maximizing = (position.current_player == player)
+        
+        # Call minimax
+        score, best_move = self.minimax(position, self.max_depth, 
+                                       maximizing, player)
+        
+        self.end_time = time.time()
+        if instrumentation is not None:
+            instrumentation.iteration_done(self.max_depth, score, [best_move],
+                                           self.nodes_explored)
+        
+        # Compile metrics
+        metrics = {
+            'algorithm': 'Minimax',
+            'nodes_explored': self.nodes_explored,
+            'max_depth_reached': self.max_depth_reached,
+            'time_taken': self.end_time - self.start_time,
+            'best_score': score,
+            'best_move': best_move
+        }
+        if instrumentation is not None:
+            metrics['instrumentation'] = instrumentation.report(self)
+        
+        return best_move, metrics
+
+
+# The one process pool of the parallel searches, replaced when an agent
+# asks for another worker count so idle pools never pile up
+_PROCESS_POOL = None
+_PROCESS_POOL_WORKERS = 0
+
+# Counter shared with the pool's processes. Tasks carry its value from when
+# they were submitted, and stop_pool_tasks() bumps it, which ends every task
+# still running at its next stop poll. In a worker process it is handed over
+# by init_pool_worker.
+_POOL_GENERATION = None
+
+
+def get_process_pool(workers: int) -> ProcessPoolExecutor:
+    global _PROCESS_POOL, _PROCESS_POOL_WORKERS, _POOL_GENERATION
+    if _PROCESS_POOL is not None and _PROCESS_POOL_WORKERS != workers:
+        shutdown_process_pool()
+    if _PROCESS_POOL is None:
+        # Searches run on an EngineWorker thread, and forking a process with
+        # threads can copy locks held by them, so workers are never forked
+        # from this process
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods
+                                              else 'spawn')
+        # Synchronized objects only reach other processes as they start
+        if _POOL_GENERATION is None:
+            _POOL_GENERATION = context.Value('q', 0)
+        _PROCESS_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                            initializer=init_pool_worker,
+                                            initargs=(_POOL_GENERATION,))
+        _PROCESS_POOL_WORKERS = workers
+    return _PROCESS_POOL
+
+
+def init_pool_worker(generation):
+    global _POOL_GENERATION
+    _POOL_GENERATION = generation
+
+
+# Generation to send with newly submitted tasks
+def pool_generation() -> int:
+    return _POOL_GENERATION.value
+
+
+# Stop every task submitted so far, running or not
+def stop_pool_tasks():
+    if _POOL_GENERATION is not None:
+        with _POOL_GENERATION.get_lock():
+            _POOL_GENERATION.value += 1
+
+
+def pool_task_stopped(generation: int) -> bool:
+    return _POOL_GENERATION.value != generation
+
+
+def shutdown_process_pool():
+    global _PROCESS_POOL, _PROCESS_POOL_WORKERS
+    if _PROCESS_POOL is not None:
+        # Running tasks would otherwise keep the old processes busy
+        stop_pool_tasks()
+        _PROCESS_POOL.shutdown(wait=False, cancel_futures=True)
+        _PROCESS_POOL = None
+        _PROCESS_POOL_WORKERS = 0
+
+
+atexit.register(shutdown_process_pool)
+
+
+# Agents living in a worker process, kept between tasks so their
+# transposition tables stay warm from one move to the next
+_WORKER_AGENTS = {}
+
+
+# Cached agent of this worker process for the game size and configuration,
+# created with the extra arguments the first time it is asked for
+def worker_agent(agent_class: type, position: ConnectFour, agent_config: Tuple,
+                 **kwargs):
+    agent_key = (agent_class, position.ROWS, position.COLS, position.CONNECT,
+                 agent_config)
+    agent = _WORKER_AGENTS.get(agent_key)
+    if agent is None:
+        agent = agent_class(position, **kwargs, **dict(agent_config))
+        _WORKER_AGENTS[agent_key] = agent
+    return agent
+
+
+# Deadlines cross processes as wall-clock times: perf_counter() clocks are
+# not shared between processes
+def wall_clock_deadline(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    return time.time() + (deadline - time.perf_counter())
+
+
+def local_deadline(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    return time.perf_counter() + (deadline - time.time())
+
+
+# Results of worker tasks in submission order. Waits in short slices so once
+# stopped() is true the remaining tasks are cancelled instead of waited for.
+def collect_worker_results(futures: List, stopped: Callable[[], bool]) -> Iterator[Tuple]:
+    for future in futures:
+        while True:
+            try:
+                yield future.result(timeout=0.05)
+                break
+            except FutureTimeoutError:
+                if stopped():
+                    for pending in futures:
+                        pending.cancel()
+                    return
+
+
+# Worker side of the root-parallel search: search one root move of the
+# position and report the score and search statistics
+def search_root_move(task: Tuple) -> Tuple[int, Optional[float], List[int], int, int, int]:
+    (agent_class, agent_config, position_class, rows, cols, connect, board,
+     current_player, move, depth, alpha, beta, player, deadline, generation) = task
+    
+    position = position_class(rows, cols, connect)
+    position.current_player = current_player
+    position.board = board
+    
+    agent = worker_agent(agent_class, position, agent_config, max_depth=depth,
+                         endgame_threshold=0)
+    if agent.incremental_eval:
+        position.enable_incremental_eval()
+    
+    agent.reset_metrics()
+    agent.prepare_search(player)
+    agent.search_depth = depth
+    agent.deadline = local_deadline(deadline)
+    agent.pool_generation = generation
+    
+    position.make_move(move)
+    pv = []
+    try:
+        score, reply = agent.alpha_beta(position, depth - 1, alpha, beta,
+                                        position.current_player == player, player)
+        pv = agent.extract_pv(position, reply, depth - 1)
+    except SearchTimeout:
+        score = None
+    finally:
+        agent.deadline = None
+        agent.pool_generation = None
+    
+    return (move, score, pv, agent.nodes_explored, agent.pruning_count,
+            agent.max_depth_reached)
+
+
+class AlphaBetaAgent(InstrumentedAgent):
+    
+    # Name reported in the metrics dict
+    ALGORITHM_NAME = 'Alpha-Beta'
+    
+    # Recursive search method counted by SearchInstrumentation
+    SEARCH_METHOD = 'alpha_beta'
+    
+    # Root drivers: one full-window search, aspiration windows around the
+    # previous iteration's score, or MTD(f) zero-window passes
+    STRATEGIES = ('full', 'aspiration', 'mtdf')
+    
+    # Initial half-width of an aspiration window, in evaluation points
+    ASPIRATION_WINDOW = 25
+    
+    def __init__(self, game: ConnectFour, max_depth: int = 6,
+                 use_tt: bool = True, tt_memory_mb: float = 16,
+                 tt_replacement: str = 'depth',
+                 time_limit: Optional[float] = None,
+                 dynamic_ordering: bool = True,
+                 strategy: str = 'full',
+                 opening_book: Optional[OpeningBook] = None,
+                 endgame_threshold: int = 20,
+                 workers: int = 1,
+                 incremental_eval: bool = True,
+                 batch_leaves: bool = False,
+                 tactics: bool = True,
+                 eval_weights: Optional[Dict[str, int]] = None,
+                 instrumentation: Optional[SearchInstrumentation] = None,
+                 iterative: bool = False, depth_capped: bool = False):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown search strategy: {strategy}")
+        if strategy == 'mtdf' and not use_tt:
+            raise ValueError("MTD(f) needs the transposition table")
+        if workers > 1 and strategy != 'full':
+            raise ValueError("Parallel search only supports the 'full' strategy")
+        
+        self.game = game
+        self.max_depth = max_depth
+        self.evaluator = Evaluator(game, eval_weights)
+        
+        # Tactical shortcuts before ordering: take an immediate win, answer
+        # a single threat, and skip moves under the opponent's winning cells
+        self.tactics = tactics
+        
+        # Searched positions keep their window counts up to date, so leaves
+        # are scored without rebuilding the board
+        self.incremental_eval = incremental_eval
+        
+        # Score all children of a node one ply above the horizon in a single
+        # Evaluator.evaluate_batch call; pays off without incremental_eval
+        # (not used with a threat weight, which the batch does not score)
+        self.batch_leaves = batch_leaves
+        self.leaf_scores = {}
+        
+        # Mirror images share table entries, which needs an evaluation that
+        # scores them alike (the center column maps to itself)
+        self.use_symmetry = self.evaluator.symmetric
+        
+        # Killer/history ordering; dynamic_ordering=False keeps only the
+        # hash move and the static center-first order for comparison
+        self.move_orderer = MoveOrderer(game.COLS, game.ROWS * game.COLS,
+                                        dynamic_ordering)
+        
+        # With a time limit (seconds) the agent deepens iteratively until the
+        # budget runs out instead of searching straight to max_depth.
+        # iterative=True deepens without one too, so every depth is reported
+        # and a stopped search still returns the last completed depth.
+        # depth_capped=True also stops a timed search at max_depth.
+        self.time_limit = time_limit
+        self.iterative = iterative
+        self.depth_capped = depth_capped
+        self.deadline = None
+        self.search_depth = max_depth
+        self.strategy = strategy
+        self.opening_book = opening_book
+        
+        # Solve exactly instead of searching once this few cells are empty
+        # (0 turns the solver off)
+        self.endgame_threshold = endgame_threshold
+        self.endgame_solver = (EndgameSolver(game.ROWS, game.COLS, game.CONNECT)
+                               if endgame_threshold else None)
+        if self.endgame_solver is not None:
+            self.endgame_solver.should_stop = self.search_stopped
+        
+        # Principal variation of the last completed iteration, by position key
+        self.pv_moves = {}
+        
+        # Set from another thread to abort the running search (ponder/stop)
+        self.stop_requested = False
+        
+        # Generation of the pool task a worker process is running, which
+        # stop_pool_tasks() in the main process can end (see search_stopped)
+        self.pool_generation = None
+        
+        # Answers found while pondering, by (position key, player)
+        self.ponder_results = {}
+        
+        # Root-parallel search: the first root move is searched here, the
+        # others in worker processes with the bound it sets
+        self.workers = workers
+        self.worker_config = (('use_tt', use_tt), ('tt_memory_mb', tt_memory_mb),
+                              ('tt_replacement', tt_replacement),
+                              ('dynamic_ordering', dynamic_ordering),
+                              ('incremental_eval', incremental_eval),
+                              ('batch_leaves', batch_leaves),
+                              ('tactics', tactics),
+                              ('eval_weights', tuple(sorted(self.evaluator.weights.items()))))
+        
+        # Transposition table, kept between moves. Scores are stored from the
+        # searching player's point of view, so it is cleared when that changes.
+        self.tt = TranspositionTable(tt_memory_mb, tt_replacement) if use_tt else None
+        self.tt_player = None
+        
+        # Performance metrics
+        self.nodes_explored = 0
+        self.max_depth_reached = 0
+        self.pruning_count = 0  # Number of branches pruned
+        self.depth_completed = 0
+        self.iteration_times = []
+        self.window_re_searches = 0  # Aspiration windows that failed
+        self.mtdf_passes = 0         # Zero-window searches run by MTD(f)
+        self.tactical_wins = 0       # Nodes cut short by an immediate win
+        self.forced_moves = 0        # Nodes reduced to a single block
+        self.unsafe_moves_skipped = 0  # Moves dropped under opponent wins
+        self.worker_nodes = 0        # Nodes searched by worker processes
+        self.worker_pv = []          # Root line found by a worker process
+        self.start_time = 0
+        self.end_time = 0
+        
+        # Detailed statistics for diagnosing a search; worker processes
+        # search without it, so only this process's nodes are counted
+        self.instrumentation = None
+        self.set_instrumentation(instrumentation)
+        
+    def reset_metrics(self):
+        self.nodes_explored = 0
+        self.max_depth_reached = 0
+        self.pruning_count = 0
+        self.depth_completed = 0
+        self.iteration_times = []
+        self.window_re_searches = 0
+        self.mtdf_passes = 0
+        self.tactical_wins = 0
+        self.forced_moves = 0
+        self.unsafe_moves_skipped = 0
+        self.worker_nodes = 0
+        self.worker_pv = []
+        self.start_time = 0
+        self.end_time = 0
+    
+    # Per-search setup shared with the worker processes
+    def prepare_search(self, player: int):
+        self.leaf_scores = {}
+        if self.tt is not None:
+            if self.tt_player != player:
+                self.tt.clear()
+                self.tt_player = player
+            self.tt.reset_stats()
+        self.move_orderer.new_search()
+    
+    def alpha_beta(self, game_state: ConnectFour, depth: int, 
+                   alpha: float, beta: float,
+                   maximizing_player: bool, player: int) -> Tuple[float, Optional[int]]:
+    
+        # Update metrics
+        self.nodes_explored += 1
+        self.max_depth_reached = max(self.max_depth_reached, 
+                                     self.search_depth - depth)
+        
+        # Check the clock and the stop flag every 64 nodes
+        if self.nodes_explored & 63 == 0 and self.search_stopped():
+            raise SearchTimeout()
+        
+        # Terminal state (the winner is cached on the position)
+        winner = game_state.check_winner()
+        if winner == player:
+            return (1000000, None)  # Win
+        elif winner is not None:
+            return (-1000000, None)  # Loss
+        
+        # Get valid moves
+        valid_moves = game_state.get_valid_moves()
+        if len(valid_moves) == 0:
+            return (0, None)  # Draw
+        
+        # Transposition table lookup
+        tt = self.tt
+        hash_move = None
+        if tt is not None:
+            alpha_orig = alpha
+            beta_orig = beta
+            key, mirrored, hash_move, alpha, beta, tt_score = self.probe_table(
+                game_state, depth, alpha, beta)
+            if tt_score is not None:
+                return (tt_score, hash_move)
+        
+        # Depth limit reached, evaluate non-terminal position
+        if depth == 0:
+            score = self.leaf_scores.pop(game_state.zobrist_key, None)
+            if score is None:
+                score = self.evaluator.evaluate_state(game_state, player)
+            if tt is not None:
+                tt.store(key, 0, score, TranspositionTable.EXACT, None)
+            return (score, None)
+        
+        # The previous iteration's principal variation beats the table move
+        if self.pv_moves:
+            pv_move = self.pv_moves.get(game_state.zobrist_key)
+            if pv_move is not None:
+                hash_move = pv_move
+        
+        mover = game_state.current_player
+        if self.tactics:
+            decided, won, moves = self.tactical_moves(game_state, valid_moves)
+            if decided:
+                return (1000000 if won == (mover == player) else -1000000, moves)
+            valid_moves = moves
+        
+        # Order moves (hash move, killers, history, then center first)
+        ply = self.search_depth - depth
+        valid_moves = self.move_orderer.order_moves(valid_moves, ply, hash_move, mover)
+        if depth == 1 and self.batch_leaves and not self.evaluator.threat_weight:
+            self.batch_child_scores(game_state, valid_moves, player)
+        
+        if maximizing_player:
+            # MAX player (trying to maximize score)
+            best_score = float('-inf')
+            best_move = valid_moves[0]
+            
+            for index, move in enumerate(valid_moves):
+                game_state.make_move(move)
+                
+                # Recursive call
+                eval_score, _ = self.alpha_beta(game_state, depth - 1, 
+                                               alpha, beta, False, player)
+                
+                game_state.undo_move()
+                
+                if eval_score > best_score:
+                    best_score = eval_score
+                    best_move = move
+                
+                # Update alpha
+                alpha = max(alpha, eval_score)
+                
+                # Beta cutoff (pruning)
+                if beta <= alpha:
+                    self.pruning_count += 1
+                    self.move_orderer.record_cutoff(mover, move, ply, depth, index)
+                    break  # Prune remaining branches
+        
+        else:
+            # MIN player (trying to minimize score)
+            best_score = float('inf')
+            best_move = valid_moves[0]
+            
+            for index, move in enumerate(valid_moves):
+                game_state.make_move(move)
+                
+                # Recursive call
+                eval_score, _ = self.alpha_beta(game_state, depth - 1, 
+                                               alpha, beta, True, player)
+                
+                game_state.undo_move()
+                
+                if eval_score < best_score:
+                    best_score = eval_score
+                    best_move = move
+                
+                # Update beta
+                beta = min(beta, eval_score)
+                
+                # Alpha cutoff (pruning)
+                if beta <= alpha:
+                    self.pruning_count += 1
+                    self.move_orderer.record_cutoff(mover, move, ply, depth, index)
+                    break  # Prune remaining branches
+        
+        # Store the result with the bound type implied by the original window
+        if tt is not None:
+            self.store_table(game_state, key, mirrored, depth, best_score,
+                             alpha_orig, beta_orig, best_move)
+        
+        return (best_score, best_move)
+    
+    # Evaluate the children of a node together, keyed by their hash. The
+    # depth-0 nodes pick their score up from here instead of evaluating.
+    def batch_child_scores(self, game_state: ConnectFour, moves: List[int], perspective: int):
+        mover = game_state.current_player
+        pieces = game_state.zobrist_pieces[mover]
+        parent_key = game_state.zobrist_key ^ game_state.zobrist_side
+        
+        boards = np.repeat(game_state.board[np.newaxis], len(moves), axis=0)
+        keys = []
+        for index, col in enumerate(moves):
+            row = game_state.get_next_open_row(col)
+            boards[index, row, col] = mover
+            keys.append(parent_key ^ pieces[row * game_state.COLS + col])
+        
+        scores = self.evaluator.evaluate_batch(boards, perspective)
+        self.leaf_scores = dict(zip(keys, scores.tolist()))
+    
+    def get_best_move(self, game_state: ConnectFour, player: int,
+                      strategy: Optional[str] = None) -> Tuple[int, Dict]:
+        strategy = strategy or self.strategy
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown search strategy: {strategy}")
+        if strategy == 'mtdf' and self.tt is None:
+            raise ValueError("MTD(f) needs the transposition table")
+        if self.workers > 1 and strategy != 'full':
+            raise ValueError("Parallel search only supports the 'full' strategy")
+        
+        # A position already searched while pondering is answered straight away
+        pondered = self.ponder_results.pop((game_state.zobrist_key, player), None)
+        if pondered is not None:
+            best_move, metrics = pondered
+            return best_move, dict(metrics, pondered=True)
+        
+        self.reset_metrics()
+        self.start_time = time.time()
+        clock_start = time.perf_counter()
+        
+        # Search a private copy with make/undo so the caller's game is untouched
+        position = game_state.copy()
+        if self.incremental_eval and position.eval_state is None:
+            position.enable_incremental_eval()
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            instrumentation.start_search(position)
+        
+        # The root maximizes when it is the searching player's turn
+        maximizing = (position.current_player == player)
+        self.prepare_search(player)
+        
+        # Book positions are keyed for the side to move
+        book_entry = None
+        if self.opening_book is not None and maximizing:
+            book_entry = self.opening_book.lookup(position)
+        
+        empty_cells = position.ROWS * position.COLS - len(position.move_history)
+        endgame_result = None
+        
+        # A solve cut short by the time budget leaves the rest of it to the
+        # normal search
+        solved = None
+        if (book_entry is None and self.endgame_solver is not None and maximizing
+                and empty_cells <= self.endgame_threshold and not position.is_game_done()):
+            solved = self.solve_endgame(position, clock_start)
+        
+        self.pv_moves = {}
+        if book_entry is not None:
+            best_move, score = book_entry
+            pv = [best_move]
+        elif solved is not None:
+            best_move, solver_score = solved
+            self.depth_completed = empty_cells
+            endgame_result = self.endgame_solver.describe_score(
+                solver_score, len(position.move_history))
+            score = 1000000 if solver_score > 0 else -1000000 if solver_score < 0 else 0
+            pv = [best_move]
+        elif self.time_limit is None and strategy == 'full' and not self.iterative:
+            # Call alpha-beta with initial alpha and beta values
+            self.search_depth = self.max_depth
+            score, best_move = self.search_root(position, self.max_depth,
+                                                maximizing, player)
+            self.depth_completed = self.max_depth
+            pv = self.extract_pv(position, best_move, self.max_depth)
+        else:
+            # Windowed drivers need the previous iteration's score as a guess
+            time_left = None
+            if self.time_limit is not None:
+                time_left = self.time_limit - (time.perf_counter() - clock_start)
+            score, best_move, pv = self.iterative_deepening(position, maximizing, player,
+                                                            strategy, time_left)
+        
+        self.end_time = time.time()
+        
+        # Book moves, solved endgames and fixed-depth searches are one step
+        if instrumentation is not None and not instrumentation.iterations:
+            instrumentation.iteration_done(self.depth_completed, score, pv,
+                                           self.nodes_explored)
+        
+        # Compile metrics
+        metrics = {
+            'algorithm': self.ALGORITHM_NAME,
+            'nodes_explored': self.nodes_explored,
+            'max_depth_reached': self.max_depth_reached,
+            'pruning_count': self.pruning_count,
+            'time_taken': self.end_time - self.start_time,
+            'best_score': score,
+            'best_move': best_move,
+            'depth_completed': self.depth_completed,
+            'principal_variation': pv,
+            'strategy': strategy,
+            'book_hit': book_entry is not None
+        }
+        if endgame_result is not None:
+            metrics['endgame_result'] = endgame_result
+        if strategy == 'aspiration':
+            metrics['window_re_searches'] = self.window_re_searches
+        elif strategy == 'mtdf':
+            metrics['mtdf_passes'] = self.mtdf_passes
+        if self.time_limit is not None:
+            metrics['time_limit'] = self.time_limit
+            metrics['iteration_times'] = self.iteration_times
+        if self.tactics:
+            metrics['tactical_wins'] = self.tactical_wins
+            metrics['forced_moves'] = self.forced_moves
+            metrics['unsafe_moves_skipped'] = self.unsafe_moves_skipped
+        if self.workers > 1:
+            metrics['workers'] = self.workers
+            metrics['worker_nodes'] = self.worker_nodes
+        metrics.update(self.move_orderer.get_stats())
+        if self.tt is not None:
+            metrics.update(self.tt.get_stats())
+        if instrumentation is not None:
+            metrics['instrumentation'] = instrumentation.report(self)
+        
+        return best_move, metrics
+    
+    # Swap evaluation weights between searches. Stored scores and pondered
+    # answers came from the old weights, so they are dropped.
+    def set_eval_weights(self, weights: Dict[str, int]):
+        self.evaluator.set_weights(weights)
+        config = dict(self.worker_config)
+        config['eval_weights'] = tuple(sorted(self.evaluator.weights.items()))
+        self.worker_config = tuple(config.items())
+        if self.tt is not None:
+            self.tt.clear()
+        self.leaf_scores = {}
+        self.ponder_results = {}
+    
+    # Abort the running search or ponder from another thread
+    def stop(self):
+        self.stop_requested = True
+        if self.workers > 1:
+            stop_pool_tasks()
+    
+    # Whether the stop flag, the deadline or a stop of the pool task ends the
+    # running search
+    def search_stopped(self) -> bool:
+        if self.stop_requested:
+            return True
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            return True
+        return self.pool_generation is not None and pool_task_stopped(self.pool_generation)
+    
+    # Search every reply of the opponent ahead of time, the expected one
+    # first, and keep the answers for get_best_move. Runs until all replies
+    # are searched or stop() is called; returns how many were searched.
+    def ponder(self, game_state: ConnectFour, player: int) -> int:
+        self.ponder_results = {}
+        position = game_state.copy()
+        
+        replies = [col for col in self.move_orderer.center_order
+                   if position.is_valid_move(col)]
+        expected = self.table_move(position)
+        if expected in replies:
+            replies.remove(expected)
+            replies.insert(0, expected)
+        
+        # Worker processes cannot see the stop flag, so ponder in-process
+        workers = self.workers
+        self.workers = 1
+        try:
+            for reply in replies:
+                if self.stop_requested:
+                    break
+                position.make_move(reply)
+                if not position.is_game_done():
+                    try:
+                        result = self.get_best_move(position, player)
+                    except SearchTimeout:
+                        result = None
+                    
+                    # A search cut short by stop() is not an answer
+                    if self.stop_requested:
+                        position.undo_move()
+                        break
+                    self.ponder_results[(position.zobrist_key, player)] = result
+                position.undo_move()
+        finally:
+            self.workers = workers
+            self.stop_requested = False
+        
+        return len(self.ponder_results)
+    
+    # Exact best move and solver score of the position, or None when stop()
+    # or half the time budget (counted from clock_start) ends the solve first,
+    # leaving the other half to the normal search
+    def solve_endgame(self, position: ConnectFour,
+                      clock_start: float) -> Optional[Tuple[int, int]]:
+        if self.time_limit is not None:
+            self.deadline = clock_start + self.time_limit / 2
+        try:
+            return self.endgame_solver.solve(position)
+        except SearchTimeout:
+            return None
+        finally:
+            self.deadline = None
+            self.nodes_explored += self.endgame_solver.nodes
+    
+    # Deepen one ply at a time up to max_depth or, with a time limit, until
+    # time_left (seconds) runs out (or max_depth is reached, if depth_capped),
+    # keeping the result of the last iteration that finished
+    def iterative_deepening(self, position: ConnectFour, maximizing: bool,
+                            player: int, strategy: str = 'full',
+                            time_left: Optional[float] = None) -> Tuple[float, Optional[int], List[int]]:
+        clock_start = time.perf_counter()
+        if time_left is None:
+            time_left = self.time_limit
+        root_moves = len(position.move_history)
+        if self.time_limit is None:
+            last_depth = self.max_depth
+        else:
+            last_depth = position.ROWS * position.COLS - root_moves
+            if self.depth_capped:
+                last_depth = min(self.max_depth, last_depth)
+        
+        score, best_move, pv = 0, None, []
+        for depth in range(1, last_depth + 1):
+            # Depth 1 always completes so there is a move to return
+            if depth > 1 and self.time_limit is not None:
+                self.deadline = clock_start + time_left
+            self.search_depth = depth
+            iteration_start = time.perf_counter()
+            
+            # The first iteration has no score to center a window on
+            guess = score if depth > 1 else None
+            
+            try:
+                if strategy == 'aspiration':
+                    score, best_move = self.aspiration_search(position, depth, maximizing,
+                                                              player, guess)
+                elif strategy == 'mtdf':
+                    score, best_move = self.mtdf(position, depth, maximizing, player, guess)
+                else:
+                    score, best_move = self.search_root(position, depth, maximizing, player)
+            except SearchTimeout:
+                # Unwind the moves left on the board by the aborted search
+                while len(position.move_history) > root_moves:
+                    position.undo_move()
+                break
+            finally:
+                self.deadline = None
+            
+            self.iteration_times.append(time.perf_counter() - iteration_start)
+            self.depth_completed = depth
+            
+            # Reuse this iteration's principal variation for move ordering
+            pv = self.extract_pv(position, best_move, depth)
+            self.pv_moves = {}
+            for move in pv:
+                self.pv_moves[position.zobrist_key] = move
+                position.make_move(move)
+            for _ in pv:
+                position.undo_move()
+            
+            if self.instrumentation is not None:
+                self.instrumentation.iteration_done(depth, score, pv, self.nodes_explored)
+            
+            # A proven win or loss will not change with more depth
+            if abs(score) >= 1000000:
+                break
+            
+            # The next iteration takes several times longer than this one
+            if (self.time_limit is not None
+                    and time.perf_counter() - clock_start > time_left / 2):
+                break
+        
+        return score, best_move, pv
+    
+    # Tactical filter for the side to move. Returns a known result as
+    # (True, win, move), otherwise (False, None, moves still worth searching).
+    def tactical_moves(self, game_state: ConnectFour,
+                       valid_moves: List[int]) -> Tuple[bool, Optional[bool], List[int]]:
+        mover = game_state.current_player
+        wins = game_state.winning_moves(mover)
+        if wins:
+            self.tactical_wins += 1
+            return True, True, wins[0]
+        
+        threats, under_threats = game_state.opponent_threats(mover)
+        if len(threats) > 1:
+            # Two winning cells cannot both be blocked
+            return True, False, threats[0]
+        if threats:
+            self.forced_moves += 1
+            return False, None, threats
+        
+        if under_threats:
+            safe_moves = [move for move in valid_moves if move not in under_threats]
+            if not safe_moves:
+                # Every move opens a winning cell for the opponent
+                return True, False, valid_moves[0]
+            self.unsafe_moves_skipped += len(valid_moves) - len(safe_moves)
+            valid_moves = safe_moves
+        return False, None, valid_moves
+    
+    # Transposition table key of a position and whether it is mirrored
+    def table_key(self, game_state: ConnectFour) -> Tuple[int, bool]:
+        if self.use_symmetry:
+            return game_state.canonical_key()
+        return (game_state.zobrist_key, False)
+    
+    # Look a node up in the table. Returns its key, whether it is mirrored,
+    # the hash move in the position's own columns, the window narrowed by a
+    # stored bound, and the score to return at once (None if the search goes on)
+    def probe_table(self, game_state: ConnectFour, depth: int, alpha: float,
+                    beta: float) -> Tuple[int, bool, Optional[int], float, float,
+                                          Optional[float]]:
+        key, mirrored = self.table_key(game_state)
+        entry = self.tt.probe(key)
+        if entry is None:
+            return (key, mirrored, None, alpha, beta, None)
+        hash_move = entry[4]
+        if mirrored and hash_move is not None:
+            hash_move = game_state.mirror_move(hash_move)
+        if entry[1] >= depth:
+            tt_score, tt_flag = entry[2], entry[3]
+            if tt_flag == TranspositionTable.EXACT:
+                return (key, mirrored, hash_move, alpha, beta, tt_score)
+            elif tt_flag == TranspositionTable.LOWER_BOUND:
+                alpha = max(alpha, tt_score)
+            else:
+                beta = min(beta, tt_score)
+            if beta <= alpha:
+                return (key, mirrored, hash_move, alpha, beta, tt_score)
+        return (key, mirrored, hash_move, alpha, beta, None)
+    
+    # Store a searched node, flagged by where its score fell in the window
+    # the node was entered with
+    def store_table(self, game_state: ConnectFour, key: int, mirrored: bool,
+                    depth: int, score: float, alpha: float, beta: float,
+                    best_move: Optional[int]) -> None:
+        if score <= alpha:
+            flag = TranspositionTable.UPPER_BOUND
+        elif score >= beta:
+            flag = TranspositionTable.LOWER_BOUND
+        else:
+            flag = TranspositionTable.EXACT
+        if mirrored:
+            best_move = game_state.mirror_move(best_move)
+        self.tt.store(key, depth, score, flag, best_move)
+    
+    # Best move stored for a position, in its own columns
+    def table_move(self, game_state: ConnectFour) -> Optional[int]:
+        if self.tt is None:
+            return None
+        key, mirrored = self.table_key(game_state)
+        move = self.tt.get_move(key)
+        if mirrored and move is not None:
+            move = game_state.mirror_move(move)
+        return move
+    
+    # Full-window search of the root, split across processes if configured
+    def search_root(self, position: ConnectFour, depth: int, maximizing: bool,
+                    player: int) -> Tuple[float, Optional[int]]:
+        if self.workers > 1 and depth > 1:
+            return self.parallel_root_search(position, depth, maximizing, player)
+        return self.alpha_beta(position, depth, float('-inf'), float('inf'),
+                               maximizing, player)
+    
+    # Search the first root move locally, then the remaining moves in the
+    # worker processes with the bound it established
+    def parallel_root_search(self, position: ConnectFour, depth: int, maximizing: bool,
+                             player: int) -> Tuple[float, Optional[int]]:
+        valid_moves = position.get_valid_moves()
+        if len(valid_moves) == 0 or position.is_game_done():
+            return self.alpha_beta(position, depth, float('-inf'), float('inf'),
+                                   maximizing, player)
+        
+        hash_move = self.pv_moves.get(position.zobrist_key)
+        if hash_move is None:
+            hash_move = self.table_move(position)
+        moves = self.move_orderer.order_moves(valid_moves, 0, hash_move,
+                                              position.current_player)
+        
+        self.nodes_explored += 1
+        best_move = moves[0]
+        self.worker_pv = []
+        position.make_move(best_move)
+        best_score, _ = self.alpha_beta(position, depth - 1, float('-inf'), float('inf'),
+                                        not maximizing, player)
+        position.undo_move()
+        
+        # Only moves that beat the first one matter to the workers
+        if maximizing:
+            alpha, beta = best_score, float('inf')
+        else:
+            alpha, beta = float('-inf'), best_score
+        
+        deadline = wall_clock_deadline(self.deadline)
+        tasks = [(type(self), self.worker_config, type(position), position.ROWS,
+                  position.COLS, position.CONNECT, position.board, position.current_player,
+                  move, depth, alpha, beta, player, deadline)
+                 for move in moves[1:]]
+        # A proven win for the side at the root needs no further search
+        proven_win = best_score >= 1000000 if maximizing else best_score <= -1000000
+        if tasks and not proven_win:
+            pool = get_process_pool(self.workers)
+            generation = pool_generation()
+            futures = [pool.submit(search_root_move, task + (generation,)) for task in tasks]
+            results = collect_worker_results(futures, lambda: self.stop_requested)
+            for move, score, pv, nodes, pruned, reached in results:
+                self.nodes_explored += nodes
+                self.worker_nodes += nodes
+                self.pruning_count += pruned
+                self.max_depth_reached = max(self.max_depth_reached, reached)
+                if score is None:
+                    raise SearchTimeout()
+                if (score > best_score) if maximizing else (score < best_score):
+                    best_score = score
+                    best_move = move
+                    self.worker_pv = [move] + pv
+            if self.stop_requested:
+                raise SearchTimeout()
+        
+        # Record the root so the principal variation starts from it
+        if self.tt is not None:
+            key, mirrored = self.table_key(position)
+            self.tt.store(key, depth, best_score, TranspositionTable.EXACT,
+                          position.mirror_move(best_move) if mirrored else best_move)
+        
+        return (best_score, best_move)
+    
+    # Search a narrow window around the guess, widening the side that fails
+    def aspiration_search(self, position: ConnectFour, depth: int, maximizing: bool,
+                          player: int, guess: Optional[float]) -> Tuple[float, Optional[int]]:
+        if guess is None or abs(guess) >= 1000000:
+            return self.alpha_beta(position, depth, float('-inf'), float('inf'),
+                                   maximizing, player)
+        
+        low_delta = high_delta = self.ASPIRATION_WINDOW
+        while True:
+            alpha = guess - low_delta
+            beta = guess + high_delta
+            score, best_move = self.alpha_beta(position, depth, alpha, beta,
+                                               maximizing, player)
+            if score <= alpha:
+                low_delta *= 4
+            elif score >= beta:
+                high_delta *= 4
+            else:
+                return (score, best_move)
+            
+            # Give up on the window once it no longer saves anything
+            self.window_re_searches += 1
+            if low_delta > 1000:
+                low_delta = float('inf')
+            if high_delta > 1000:
+                high_delta = float('inf')
+    
+    # MTD(f): zero-window searches that close in on the minimax value,
+    # relying on the transposition table to make each pass cheap
+    def mtdf(self, position: ConnectFour, depth: int, maximizing: bool,
+             player: int, guess: Optional[float]) -> Tuple[float, Optional[int]]:
+        score = 0 if guess is None else guess
+        lower = float('-inf')
+        upper = float('inf')
+        best_move = None
+        
+        while lower < upper:
+            beta = score + 1 if score == lower else score
+            self.mtdf_passes += 1
+            score, move = self.alpha_beta(position, depth, beta - 1, beta,
+                                          maximizing, player)
+            if score < beta:
+                upper = score
+            else:
+                lower = score
+            
+            # A pass that raises the root's own bound also proves its move
+            if (score >= beta) == maximizing:
+                best_move = move
+        
+        if best_move is None:
+            best_move = move
+        return (score, best_move)
+    
+    # Follow best moves from the transposition table
+    def extract_pv(self, position: ConnectFour, best_move: Optional[int],
+                   max_length: int) -> List[int]:
+        if best_move is None:
+            return []
+        
+        pv = [best_move]
+        position.make_move(best_move)
+        while self.tt is not None and len(pv) < max_length and not position.is_game_done():
+            move = self.table_move(position)
+            if move is None or not position.is_valid_move(move):
+                break
+            pv.append(move)
+            position.make_move(move)
+        
+        for _ in pv:
+            position.undo_move()
+        
+        # The line below a root move won by a worker lives in that worker's table
+        if self.worker_pv[:1] == [best_move] and len(self.worker_pv) > len(pv):
+            pv = self.worker_pv[:max_length]
+        return pv
+    
+
+class PVSAgent(AlphaBetaAgent):
+    
+    # Negamax with principal variation search: the first move gets the full
+    # window, the rest are probed with a null window and re-searched only if
+    # they fail high. Reuses the transposition table, move ordering and
+    # iterative deepening of AlphaBetaAgent.
+    ALGORITHM_NAME = 'PVS'
+    SEARCH_METHOD = 'pvs'
+    
+    def reset_metrics(self):
+        super().reset_metrics()
+        self.null_window_searches = 0
+        self.re_searches = 0
+    
+    # Root adapter: negamax scores are from the side to move, the base class
+    # works with scores from the searching player's side
+    def alpha_beta(self, game_state: ConnectFour, depth: int, 
+                   alpha: float, beta: float,
+                   maximizing_player: bool, player: int) -> Tuple[float, Optional[int]]:
+        if maximizing_player:
+            return self.pvs(game_state, depth, alpha, beta)
+        score, best_move = self.pvs(game_state, depth, -beta, -alpha)
+        return (-score, best_move)
+    
+    def pvs(self, game_state: ConnectFour, depth: int,
+            alpha: float, beta: float) -> Tuple[float, Optional[int]]:
+        
+        # Update metrics
+        self.nodes_explored += 1
+        self.max_depth_reached = max(self.max_depth_reached, 
+                                     self.search_depth - depth)
+        
+        # Check the clock and the stop flag every 64 nodes
+        if self.nodes_explored & 63 == 0 and self.search_stopped():
+            raise SearchTimeout()
+        
+        # Terminal state: a winner can only be the player who just moved
+        if game_state.check_winner() is not None:
+            return (-1000000, None)  # Loss
+        
+        valid_moves = game_state.get_valid_moves()
+        if len(valid_moves) == 0:
+            return (0, None)  # Draw
+        
+        # Transposition table lookup
+        tt = self.tt
+        hash_move = None
+        if tt is not None:
+            alpha_orig = alpha
+            beta_orig = beta
+            key, mirrored, hash_move, alpha, beta, tt_score = self.probe_table(
+                game_state, depth, alpha, beta)
+            if tt_score is not None:
+                return (tt_score, hash_move)
+        
+        # Depth limit reached, evaluate for the side to move
+        mover = game_state.current_player
+        if depth == 0:
+            score = self.leaf_scores.pop(game_state.zobrist_key, None)
+            if score is None:
+                score = self.evaluator.evaluate_state(game_state, mover)
+            if tt is not None:
+                tt.store(key, 0, score, TranspositionTable.EXACT, None)
+            return (score, None)
+        
+        if self.pv_moves:
+            pv_move = self.pv_moves.get(game_state.zobrist_key)
+            if pv_move is not None:
+                hash_move = pv_move
+        
+        if self.tactics:
+            decided, won, moves = self.tactical_moves(game_state, valid_moves)
+            if decided:
+                return (1000000 if won else -1000000, moves)
+            valid_moves = moves
+        
+        ply = self.search_depth - depth
+        valid_moves = self.move_orderer.order_moves(valid_moves, ply, hash_move, mover)
+        if depth == 1 and self.batch_leaves and not self.evaluator.threat_weight:
+            # Leaves are scored for their own side to move
+            self.batch_child_scores(game_state, valid_moves, 3 - mover)
+        
+        best_score = float('-inf')
+        best_move = valid_moves[0]
+        
+        for index, move in enumerate(valid_moves):
+            game_state.make_move(move)
+            
+            if index == 0:
+                # Principal variation move gets the full window
+                score = -self.pvs(game_state, depth - 1, -beta, -alpha)[0]
+            else:
+                # Null-window probe: can this move beat alpha at all?
+                self.null_window_searches += 1
+                score = -self.pvs(game_state, depth - 1, -alpha - 1, -alpha)[0]
+                
+                # Failed high inside the window, search again for the real score
+                if alpha < score < beta:
+                    self.re_searches += 1
+                    score = -self.pvs(game_state, depth - 1, -beta, -alpha)[0]
+            
+            game_state.undo_move()
+            
+            if score > best_score:
+                best_score = score
+                best_move = move
+            
+            alpha = max(alpha, score)
+            
+            # Beta cutoff (pruning)
+            if beta <= alpha:
+                self.pruning_count += 1
+                self.move_orderer.record_cutoff(mover, move, ply, depth, index)
+                break
+        
+        # Store the result with the bound type implied by the original window
+        if tt is not None:
+            self.store_table(game_state, key, mirrored, depth, best_score,
+                             alpha_orig, beta_orig, best_move)
+        
+        return (best_score, best_move)
+    
+    def get_best_move(self, game_state: ConnectFour, player: int,
+                      strategy: Optional[str] = None) -> Tuple[int, Dict]:
+        best_move, metrics = super().get_best_move(game_state, player, strategy)
+        if not metrics.get('pondered'):
+            metrics['null_window_searches'] = self.null_window_searches
+            metrics['re_searches'] = self.re_searches
+        return best_move, metrics
+
+
+# Every window through each cell, as cell indices padded to the same count
+# per cell with a window over a sentinel cell (index rows * cols) that stays
+# empty, so a whole batch of boards can be checked with one gather
+_CELL_LINES = {}
+
+
+def get_cell_lines(rows: int, cols: int, connect: int = 4) -> np.ndarray:
+    key = (rows, cols, connect)
+    if key not in _CELL_LINES:
+        windows = get_window_cells(rows, cols, connect)
+        cell_windows = get_cell_windows(rows, cols, connect)
+        width = max(len(cell_list) for cell_list in cell_windows)
+        lines = np.full((rows * cols, width, connect), rows * cols, dtype=np.intp)
+        for cell, cell_list in enumerate(cell_windows):
+            lines[cell, :len(cell_list)] = [windows[window] for window in cell_list]
+        lines.setflags(write=False)
+        _CELL_LINES[key] = lines
+    return _CELL_LINES[key]
+
+
+# Play count random games to the end from the position, all at once: every
+# step drops one piece in each unfinished game. Returns the number of draws,
+# wins for player 1 and wins for player 2.
+def batch_playouts(position: ConnectFour, count: int, rng) -> np.ndarray:
+    rows, cols = position.ROWS, position.COLS
+    cells = rows * cols
+    cell_lines = get_cell_lines(rows, cols, position.CONNECT)
+    
+    board = position.board
+    boards = np.zeros((count, cells + 1), dtype=np.int8)
+    boards[:, :cells] = board.ravel()
+    heights = np.tile(np.count_nonzero(board, axis=0), (count, 1))
+    winners = np.zeros(count, dtype=np.intp)
+    active = np.arange(count)
+    player = position.current_player
+    
+    for _ in range(cells - np.count_nonzero(board)):
+        if active.size == 0:
+            break
+        active_heights = heights[active]
+        
+        # The largest random key among the open columns is a uniform choice
+        keys = rng.random((active.size, cols))
+        keys[active_heights >= rows] = -1.0
+        col = keys.argmax(axis=1)
+        cell = (rows - 1 - active_heights[np.arange(active.size), col]) * cols + col
+        boards[active, cell] = player
+        heights[active, col] += 1
+        
+        # Only windows through the new piece can have been completed
+        lines = boards[active[:, np.newaxis, np.newaxis], cell_lines[cell]]
+        won = (lines == player).all(axis=2).any(axis=1)
+        winners[active[won]] = player
+        active = active[~won]
+        player = 3 - player
+    
+    return np.bincount(winners, minlength=3)
+
+
+class MCTSNode:
+    
+    # One position of the search tree. The statistics are for the player
+    # whose move led here: score adds up the fraction of playouts won (draws
+    # count half) over visits iterations.
+    __slots__ = ('move', 'parent', 'player', 'children', 'untried',
+                 'visits', 'score', 'terminal')
+    
+    def __init__(self, move: Optional[int], parent: Optional[MCTSNode], player: int):
+        self.move = move
+        self.parent = parent
+        self.player = player
+        self.children = []
+        self.untried = None   # Moves still to expand, set on the first visit
+        self.visits = 0
+        self.score = 0.0
+        self.terminal = None  # Winner of a finished game, 0 for a draw
+
+
+class MCTSAgent(InstrumentedAgent):
+    
+    # Name reported in the metrics dict
+    ALGORITHM_NAME = 'MCTS'
+    
+    # No recursive search for SearchInstrumentation to count
+    SEARCH_METHOD = None
+    
+    # Iterations searched when neither budget is given
+    DEFAULT_ITERATIONS = 1000
+    
+    # Seconds between progress reports
+    REPORT_INTERVAL = 0.25
+    
+    # Monte Carlo tree search with UCT selection. Each iteration adds one
+    # node to the tree and scores it with batch_size random playouts run
+    # together in NumPy. It needs no evaluation function and no depth
+    # limit, so it keeps working on boards too large for alpha-beta.
+    def __init__(self, game: ConnectFour, time_limit: Optional[float] = 1.0,
+                 max_iterations: Optional[int] = None,
+                 exploration: float = 1.4,
+                 batch_size: int = 32,
+                 reuse_tree: bool = True,
+                 workers: int = 1,
+                 tactics: bool = True,
+                 seed: Optional[int] = None,
+                 instrumentation: Optional[SearchInstrumentation] = None):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        
+        self.game = game
+        
+        # The search ends after time_limit seconds or max_iterations
+        # iterations, whichever comes first
+        self.time_limit = time_limit
+        self.max_iterations = max_iterations
+        if time_limit is None and max_iterations is None:
+            self.max_iterations = self.DEFAULT_ITERATIONS
+        
+        self.exploration = exploration
+        self.batch_size = batch_size
+        self.center_order = get_center_order(game.COLS)
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        
+        # Nodes only get an immediate win, or the block of a single threat,
+        # as children; the tree does not waste playouts on other moves
+        self.tactics = tactics
+        
+        # The tree of the last search is kept, and the subtree of the
+        # position reached since becomes the next root
+        self.reuse_tree = reuse_tree
+        self.root = None
+        self.root_moves = []
+        self.root_size = None
+        
+        # Root parallelism: every worker process grows its own tree for the
+        # same position and the visits of the root moves are added up.
+        # max_iterations applies to each process.
+        self.workers = workers
+        self.worker_config = (('exploration', exploration), ('batch_size', batch_size),
+                              ('reuse_tree', reuse_tree), ('tactics', tactics))
+        
+        # Set from another thread to end the search early
+        self.stop_requested = False
+        
+        # Generation of the pool task a worker process is running, which
+        # stop_pool_tasks() in the main process can end
+        self.pool_generation = None
+        
+        # Performance metrics
+        self.iterations = 0
+        self.playouts = 0
+        self.max_depth_reached = 0
+        self.reused_visits = 0
+        self.worker_playouts = 0
+        self.start_time = 0
+        self.end_time = 0
+        
+        self.instrumentation = None
+        self.set_instrumentation(instrumentation)
+    
+    def reset_metrics(self):
+        self.iterations = 0
+        self.playouts = 0
+        self.max_depth_reached = 0
+        self.reused_visits = 0
+        self.worker_playouts = 0
+        self.start_time = 0
+        self.end_time = 0
+    
+    # End the running search; it still returns its best move so far
+    def stop(self):
+        self.stop_requested = True
+        if self.workers > 1:
+            stop_pool_tasks()
+    
+    # Moves to expand at a node, popped from the end (center first)
+    def candidate_moves(self, position: ConnectFour) -> List[int]:
+        if self.tactics:
+            mover = position.current_player
+            wins = position.winning_moves(mover)
+            if wins:
+                return wins[:1]
+            threats, _ = position.opponent_threats(mover)
+            if threats:
+                return threats[:1]
+        return [col for col in reversed(self.center_order) if position.is_valid_move(col)]
+    
+    # Child with the best UCT value: mean score plus an exploration bonus
+    # for rarely visited moves
+    def select_child(self, node: MCTSNode) -> MCTSNode:
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        return max(node.children,
+                   key=lambda child: child.score / child.visits
+                   + exploration * math.sqrt(log_visits / child.visits))
+    
+    # Subtree of the last search for this position, or a new root
+    def find_root(self, position: ConnectFour) -> MCTSNode:
+        moves = position.move_history
+        size = (position.ROWS, position.COLS, position.CONNECT)
+        root = self.root
+        if (self.reuse_tree and root is not None and size == self.root_size
+                and moves[:len(self.root_moves)] == self.root_moves):
+            for move in moves[len(self.root_moves):]:
+                root = next((child for child in root.children if child.move == move), None)
+                if root is None:
+                    break
+            if root is not None:
+                root.parent = None
+                return root
+        
+        root = MCTSNode(None, None, 3 - position.current_player)
+        if position.is_game_done():
+            root.terminal = position.check_winner() or 0
+        return root
+    
+    # One iteration: select a leaf, expand one move, score it with a batch
+    # of playouts and add the result to every node on the way back up
+    def iterate(self, root: MCTSNode, position: ConnectFour):
+        node = root
+        depth = 0
+        while node.terminal is None and node.untried == [] and node.children:
+            node = self.select_child(node)
+            position.make_move(node.move)
+            depth += 1
+        
+        if node.terminal is None:
+            if node.untried is None:
+                node.untried = self.candidate_moves(position)
+            if node.untried:
+                move = node.untried.pop()
+                position.make_move(move)
+                child = MCTSNode(move, node, 3 - position.current_player)
+                winner = position.check_winner()
+                if winner is not None:
+                    child.terminal = winner
+                elif position.is_game_done():
+                    child.terminal = 0
+                node.children.append(child)
+                node = child
+                depth += 1
+        
+        if node.terminal is None:
+            results = batch_playouts(position, self.batch_size, self.rng) / self.batch_size
+        else:
+            results = [0.0, 0.0, 0.0]
+            results[node.terminal] = 1.0
+        draws = results[0] / 2
+        
+        while node is not None:
+            node.visits += 1
+            node.score += results[node.player] + draws
+            node = node.parent
+        
+        for _ in range(depth):
+            position.undo_move()
+        self.iterations += 1
+        self.playouts += self.batch_size
+        self.max_depth_reached = max(self.max_depth_reached, depth)
+    
+    # Grow the tree of the position until the deadline (perf_counter time)
+    # or the iteration budget runs out, or stop() is called
+    def search(self, position: ConnectFour, deadline: Optional[float],
+               max_iterations: Optional[int]) -> MCTSNode:
+        root = self.find_root(position)
+        self.reused_visits = root.visits
+        instrumentation = self.instrumentation
+        next_report = time.perf_counter() + self.REPORT_INTERVAL
+        
+        while root.terminal is None and not self.stop_requested:
+            if max_iterations is not None and self.iterations >= max_iterations:
+                break
+            # The first iteration always runs so there is a move to return
+            if self.iterations and deadline is not None and time.perf_counter() >= deadline:
+                break
+            # A single candidate move needs no statistics
+            if root.untried == [] and len(root.children) == 1:
+                break
+            if self.pool_generation is not None and pool_task_stopped(self.pool_generation):
+                break
+            self.iterate(root, position)
+            
+            if instrumentation is not None and time.perf_counter() >= next_report:
+                next_report += self.REPORT_INTERVAL
+                pv = self.principal_variation(root)
+                instrumentation.iteration_done(len(pv), self.node_score(root, pv, position),
+                                               pv, self.playouts)
+        
+        self.root = root
+        self.root_moves = position.move_history.copy()
+        self.root_size = (position.ROWS, position.COLS, position.CONNECT)
+        return root
+    
+    # Most visited line from the root
+    def principal_variation(self, root: MCTSNode) -> List[int]:
+        pv = []
+        node = root
+        while node.children:
+            node = max(node.children, key=lambda child: child.visits)
+            pv.append(node.move)
+        return pv
+    
+    # Score of the first move of the line for the side to move at the
+    # root, scaled like the evaluator (±1000), or ±1000000 when proven
+    def node_score(self, root: MCTSNode, pv: List[int], position: ConnectFour) -> float:
+        if not pv:
+            return 0
+        child = next(child for child in root.children if child.move == pv[0])
+        return self.score_for(child, child.visits, child.score, position.current_player)
+    
+    # Score from player's side of a root move with the given statistics
+    def score_for(self, child: MCTSNode, visits: int, score: float, player: int) -> float:
+        if child.terminal is not None:
+            if child.terminal == 0:
+                return 0
+            return 1000000 if child.terminal == player else -1000000
+        rate = score / visits if visits else 0.5
+        if child.player != player:
+            rate = 1 - rate
+        return int(round((2 * rate - 1) * 1000))
+    
+    def get_best_move(self, game_state: ConnectFour, player: int) -> Tuple[int, Dict]:
+        self.reset_metrics()
+        self.start_time = time.time()
+        
+        # Search a private copy with make/undo so the caller's game is untouched
+        position = game_state.copy()
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            instrumentation.start_search(position)
+        
+        deadline = None
+        if self.time_limit is not None:
+            deadline = time.perf_counter() + self.time_limit
+        
+        # Worker trees start before the local one and share its deadline
+        futures = []
+        if self.workers > 1 and not position.is_game_done():
+            wall_deadline = wall_clock_deadline(deadline)
+            pool = get_process_pool(self.workers)
+            generation = pool_generation()
+            for worker in range(1, self.workers):
+                seed = None if self.seed is None else self.seed + worker
+                task = (self.worker_config, type(position), position.ROWS, position.COLS,
+                        position.CONNECT, position.move_history, wall_deadline,
+                        self.max_iterations, seed, generation)
+                futures.append(pool.submit(search_mcts_root, task))
+        
+        root = self.search(position, deadline, self.max_iterations)
+        
+        # Visits and scores of the root moves over every tree; a stop() keeps
+        # the trees that already finished
+        totals = {child.move: [child.visits, child.score] for child in root.children}
+        results = collect_worker_results(futures, lambda: self.stop_requested)
+        for child_stats, iterations, playouts, depth in results:
+            for move, visits, score in child_stats:
+                if move in totals:
+                    totals[move][0] += visits
+                    totals[move][1] += score
+            self.iterations += iterations
+            self.playouts += playouts
+            self.worker_playouts += playouts
+            self.max_depth_reached = max(self.max_depth_reached, depth)
+        
+        best_move, score = None, 0
+        if root.children:
+            best_child = max(root.children,
+                             key=lambda child: (totals[child.move][0], totals[child.move][1]))
+            best_move = best_child.move
+            score = self.score_for(best_child, *totals[best_move], player)
+        elif not position.is_game_done():
+            best_move = next(col for col in self.center_order if position.is_valid_move(col))
+        pv = self.principal_variation(root)
+        if best_move is not None and pv[:1] != [best_move]:
+            pv = [best_move]
+        
+        self.end_time = time.time()
+        
+        # The last progress report may be older than the final choice
+        if instrumentation is not None:
+            instrumentation.iteration_done(len(pv), score, pv, self.playouts)
+        
+        # Compile metrics
+        metrics = {
+            'algorithm': self.ALGORITHM_NAME,
+            'nodes_explored': self.playouts,
+            'max_depth_reached': self.max_depth_reached,
+            'time_taken': self.end_time - self.start_time,
+            'best_score': score,
+            'best_move': best_move,
+            'principal_variation': pv,
+            'iterations': self.iterations,
+            'playouts': self.playouts,
+            'reused_visits': self.reused_visits,
+            'root_visits': {move: stats[0] for move, stats in totals.items()},
+        }
+        if self.workers > 1:
+            metrics['workers'] = self.workers
+            metrics['worker_playouts'] = self.worker_playouts
+        if instrumentation is not None:
+            metrics['instrumentation'] = instrumentation.report(self)
+        
+        return best_move, metrics
+
+
+# Worker side of the root-parallel MCTS: grow this process's tree for the
+# position and report the visits and scores of the root moves
+def search_mcts_root(task: Tuple) -> Tuple[List[Tuple[int, int, float]], int, int, int]:
+    (agent_config, position_class, rows, cols, connect, moves,
+     deadline, max_iterations, seed, generation) = task
+    
+    position = position_class(rows, cols, connect)
+    for move in moves:
+        position.make_move(move)
+    
+    # Kept between moves so the tree is reused like the local one
+    agent = worker_agent(MCTSAgent, position, agent_config, seed=seed)
+    agent.reset_metrics()
+    agent.pool_generation = generation
+    try:
+        root = agent.search(position, local_deadline(deadline), max_iterations)
+    finally:
+        agent.pool_generation = None
+    
+    child_stats = [(child.move, child.visits, child.score) for child in root.children]
+    return child_stats, agent.iterations, agent.playouts, agent.max_depth_reached
+
+
+class EngineWorker:
+    
+    # One long-lived thread that runs searches from a job queue. Jobs carry
+    # the generation they were submitted in: cancel() starts a new
+    # generation, stops the running search and drops queued jobs, and
+    # results from an old generation are never delivered.
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.current_agent = None
+        
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    # Queue task() to run against agent; on_done(result) or on_error(error)
+    # is called from the worker thread. Returns the job's generation.
+    def submit(self, agent, task, on_done=None, on_error=None) -> int:
+        with self.lock:
+            generation = self.generation
+            self.jobs.put((generation, agent, task, on_done, on_error))
+        return generation
+    
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+            while True:
+                try:
+                    self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+            if self.current_agent is not None:
+                self.current_agent.stop()
+    
+    # Stop the running search without dropping queued jobs. Does nothing
+    # between jobs, so a late stop never reaches the next search.
+    def stop_current(self):
+        with self.lock:
+            if self.current_agent is not None:
+                self.current_agent.stop()
+    
+    def is_current(self, generation: int) -> bool:
+        return generation == self.generation
+    
+    def shutdown(self):
+        self.cancel()
+        self.jobs.put(None)
+    
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            generation, agent, task, on_done, on_error = job
+            with self.lock:
+                if generation != self.generation:
+                    continue
+                self.current_agent = agent
+            
+            result, error = None, None
+            try:
+                result = task()
+            except Exception as e:
+                error = e
+            
+            with self.lock:
+                self.current_agent = None
+                # A stop aimed at this job must not reach the next one
+                agent.stop_requested = False
+                if generation != self.generation:
+                    continue
+            
+            if error is not None:
+                if on_error is not None:
+                    on_error(error)
+            elif on_done is not None:
+                on_done(result)
@@ -0,0 +1,361 @@
+import json
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, TextIO
+
+import connect_four_engine as engine
+
+# Line-based protocol for running the engine behind another process. Commands
+# are read from stdin, one per line; answers go to stdout:
+#
+#   isready                         -> readyok
+#   newgame [rows cols [connect]]   fresh position and search tables
+#   position [moves]                moves from the empty board, e.g. "3344"
+#                                   (comma separated on boards over 10 columns)
+#   setoption <name> <value>        see OPTIONS; not while searching
+#   options                         -> option <name> <value> ..., optionsok
+#   go [depth N] [movetime MS]      search the position in the background;
+#                                   with both, whichever limit comes first
+#   stop                            end the search, its bestmove still follows
+#   show                            the board as info string lines
+#   quit
+#
+# A search reports each completed depth as
+#   info depth D score S nodes N time T nps X pv C C ...
+# then one summary info line, and ends with "bestmove C". Scores are from the
+# side to move, "win"/"loss" for proven results. Problems are reported as
+# "error <message>" lines.
+
+ALGORITHMS = {
+    'alphabeta': engine.AlphaBetaAgent,
+    'pvs': engine.PVSAgent,
+    'minimax': engine.MinimaxAgent,
+    'mcts': engine.MCTSAgent,
+}
+
+# Option defaults; every option is set with "setoption <name> <value>"
+OPTIONS = {
+    'algorithm': 'alphabeta',  # alphabeta, pvs, minimax or mcts
+    'strategy': 'full',        # full, aspiration or mtdf (alphabeta and pvs)
+    'depth': 8,                # default depth for go
+    'movetime': 0,             # default time per go in ms, 0 for none
+    'iterations': 2000,        # mcts iterations per go without a movetime
+    'hash': 16,                # transposition table size in MB
+    'workers': 1,              # processes for the root-parallel search
+    'tactics': True,
+    'endgame': 20,             # empty cells at which the solver takes over
+    'book': '',                # opening book file, empty for none
+    'stats': False,            # add an "info stats" line of detailed statistics
+    'three': engine.Evaluator.DEFAULT_WEIGHTS['three'],
+    'two': engine.Evaluator.DEFAULT_WEIGHTS['two'],
+    'center': engine.Evaluator.DEFAULT_WEIGHTS['center'],
+    'threat': engine.Evaluator.DEFAULT_WEIGHTS['threat'],
+}
+
+
+class ProtocolError(Exception):
+    pass
+
+
+# Option value from its text, of the same type as the default
+def parse_option(name: str, value: str):
+    if name not in OPTIONS:
+        raise ProtocolError(f"unknown option {name}")
+    default = OPTIONS[name]
+    if isinstance(default, bool):
+        if value.lower() not in ('true', 'false', '1', '0', 'on', 'off'):
+            raise ProtocolError(f"option {name} takes true or false")
+        return value.lower() in ('true', '1', 'on')
+    if isinstance(default, int):
+        try:
+            return int(value)
+        except ValueError:
+            raise ProtocolError(f"option {name} takes a whole number")
+    if name == 'algorithm' and value not in ALGORITHMS:
+        raise ProtocolError(f"algorithm must be one of {', '.join(ALGORITHMS)}")
+    if name == 'strategy' and value not in engine.AlphaBetaAgent.STRATEGIES:
+        raise ProtocolError(f"strategy must be one of {', '.join(engine.AlphaBetaAgent.STRATEGIES)}")
+    return value
+
+
+def format_score(score: float) -> str:
+    if score >= 1000000:
+        return 'win'
+    if score <= -1000000:
+        return 'loss'
+    return str(int(score))
+
+
+class ProtocolSession:
+
+    # One engine instance: a position, the options and an agent kept between
+    # searches so its tables stay warm. Searches run on an EngineWorker so
+    # stop and isready are answered while one is running.
+    def __init__(self, output: TextIO):
+        self.output = output
+        self.output_lock = threading.Lock()
+        self.options = dict(OPTIONS)
+        self.rows, self.cols, self.connect = 6, 7, 4
+        self.game = engine.BitboardConnectFour(self.rows, self.cols, self.connect)
+
+        self.engine = engine.EngineWorker()
+        self.agent = None  # Rebuilt after option or board size changes
+        self.opening_book = None
+        self.searching = False
+        self.search_start = 0.0
+
+    def send(self, line: str):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    # Handle one command line; returns False once the session should end
+    def handle(self, line: str) -> bool:
+        words = line.split()
+        if not words:
+            return True
+        command, args = words[0], words[1:]
+
+        try:
+            if command == 'quit':
+                self.engine.shutdown()
+                return False
+            elif command == 'isready':
+                self.send('readyok')
+            elif command == 'newgame':
+                self.new_game(args)
+            elif command == 'position':
+                self.set_position(args)
+            elif command == 'setoption':
+                self.set_option(args)
+            elif command == 'options':
+                for name, value in self.options.items():
+                    if isinstance(value, bool):
+                        value = 'true' if value else 'false'
+                    self.send(f"option {name} {value}")
+                self.send('optionsok')
+            elif command == 'go':
+                self.go(args)
+            elif command == 'stop':
+                if self.searching:
+                    self.engine.stop_current()
+            elif command == 'show':
+                for row in str(self.game).split("\n"):
+                    self.send(f"info string {row}")
+            else:
+                raise ProtocolError(f"unknown command {command}")
+        except ProtocolError as e:
+            self.send(f"error {e}")
+        return True
+
+    # Abandon a running search without a bestmove, as its position is gone
+    def abandon_search(self):
+        if self.searching:
+            self.engine.cancel()
+            self.searching = False
+
+    def new_game(self, args: List[str]):
+        if args:
+            try:
+                sizes = [int(arg) for arg in args]
+            except ValueError:
+                sizes = []
+            if len(sizes) not in (2, 3):
+                raise ProtocolError("newgame takes no size, or rows, columns and a line length")
+            rows, cols = sizes[:2]
+            connect = sizes[2] if len(sizes) == 3 else 4
+            if rows < 4 or cols < 4:
+                raise ProtocolError("the board needs at least 4 rows and 4 columns")
+            if not 3 <= connect <= max(rows, cols):
+                raise ProtocolError(f"cannot play connect {connect} on a {rows}x{cols} board")
+            self.rows, self.cols, self.connect = rows, cols, connect
+        self.abandon_search()
+        self.game = engine.BitboardConnectFour(self.rows, self.cols, self.connect)
+        self.agent = None
+
+    def set_position(self, args: List[str]):
+        if self.cols <= 10:
+            moves = ''.join(args)
+            if moves and not moves.isdigit():
+                raise ProtocolError(f"moves must be column digits: {moves}")
+            moves = [int(col) for col in moves]
+        else:
+            try:
+                moves = [int(col) for col in ' '.join(args).replace(',', ' ').split()]
+            except ValueError:
+                raise ProtocolError("moves must be column numbers")
+
+        game = engine.BitboardConnectFour(self.rows, self.cols, self.connect)
+        for ply, col in enumerate(moves):
+            if game.is_game_done() or not game.make_move(col):
+                raise ProtocolError(f"illegal move {col} at ply {ply + 1}")
+
+        self.abandon_search()
+        self.game = game
+
+    def set_option(self, args: List[str]):
+        # The running search still uses the agent and book being replaced
+        if self.searching:
+            raise ProtocolError("options cannot change during a search, stop it first")
+        if len(args) < 1:
+            raise ProtocolError("setoption takes a name and a value")
+        name, value = args[0], ' '.join(args[1:])
+        self.options[name] = parse_option(name, value)
+
+        if name == 'book':
+            self.load_book(value)
+        if name not in ('depth', 'movetime', 'iterations'):
+            self.agent = None
+
+    def load_book(self, path: str):
+        if self.opening_book is not None:
+            self.opening_book.close()
+            self.opening_book = None
+        if path:
+            try:
+                self.opening_book = engine.OpeningBook(path)
+            except (OSError, ValueError) as e:
+                self.options['book'] = ''
+                raise ProtocolError(f"opening book not loaded: {e}")
+
+    def create_agent(self):
+        options = self.options
+        weights = {name: options[name] for name in engine.Evaluator.DEFAULT_WEIGHTS}
+        instrumentation = engine.SearchInstrumentation(self.report_iteration,
+                                                       collect_stats=options['stats'])
+        agent_class = ALGORITHMS[options['algorithm']]
+        if agent_class is engine.MinimaxAgent:
+            return agent_class(self.game, max_depth=options['depth'], eval_weights=weights,
+                               instrumentation=instrumentation)
+        if agent_class is engine.MCTSAgent:
+            return agent_class(self.game, workers=options['workers'], tactics=options['tactics'],
+                               instrumentation=instrumentation)
+
+        opening_book = self.opening_book
+        if opening_book is not None and (opening_book.ROWS, opening_book.COLS, opening_book.CONNECT) \
+                != (self.rows, self.cols, self.connect):
+            opening_book = None
+        return agent_class(self.game, max_depth=options['depth'],
+                           tt_memory_mb=options['hash'],
+                           strategy=options['strategy'],
+                           opening_book=opening_book,
+                           endgame_threshold=options['endgame'],
+                           workers=options['workers'],
+                           tactics=options['tactics'],
+                           eval_weights=weights,
+                           instrumentation=instrumentation,
+                           iterative=True)
+
+    def go(self, args: List[str]):
+        if self.searching:
+            raise ProtocolError("already searching")
+        if self.game.is_game_done():
+            raise ProtocolError("the game is over")
+
+        depth = self.options['depth']
+        movetime = self.options['movetime']
+        depth_given = False
+        for name, value in zip(args[::2], args[1::2]):
+            try:
+                if name == 'depth':
+                    depth = int(value)
+                    depth_given = True
+                elif name == 'movetime':
+                    movetime = int(value)
+                else:
+                    raise ProtocolError(f"unknown go parameter {name}")
+            except ValueError:
+                raise ProtocolError(f"go {name} takes a whole number")
+        if len(args) % 2:
+            raise ProtocolError(f"go parameter {args[-1]} has no value")
+        if depth < 1:
+            raise ProtocolError("depth must be at least 1")
+
+        if self.agent is None:
+            try:
+                self.agent = self.create_agent()
+            except ValueError as e:
+                raise ProtocolError(str(e))
+        agent = self.agent
+        if isinstance(agent, engine.MCTSAgent):
+            # Playouts need no depth; the budget is the time or the iterations
+            agent.time_limit = movetime / 1000 if movetime else None
+            agent.max_iterations = None if movetime else max(1, self.options['iterations'])
+        else:
+            agent.max_depth = depth
+            if movetime and isinstance(agent, engine.MinimaxAgent):
+                self.send("info string minimax searches to a fixed depth, movetime ignored")
+            elif not isinstance(agent, engine.MinimaxAgent):
+                agent.time_limit = movetime / 1000 if movetime else None
+                # A timed search only deepens to a depth asked for in go
+                agent.depth_capped = depth_given
+
+        game = self.game.copy()
+        player = game.current_player
+        self.searching = True
+        self.search_start = time.perf_counter()
+        self.engine.submit(agent, lambda: agent.get_best_move(game, player),
+                           lambda result: self.finish_search(game, *result),
+                           lambda error: self.fail_search(game, error))
+
+    # Progress callback of the agent, called from the engine thread
+    def report_iteration(self, depth: int, score: float, pv: List[int], nodes: int):
+        elapsed = time.perf_counter() - self.search_start
+        nps = int(nodes / elapsed) if elapsed > 0 else 0
+        line = ' '.join(str(move) for move in pv)
+        self.send(f"info depth {depth} score {format_score(score)} nodes {nodes} "
+                  f"time {elapsed * 1000:.0f} nps {nps} pv {line}")
+
+    def finish_search(self, game, move: Optional[int], metrics: Dict):
+        nodes = metrics['nodes_explored']
+        elapsed = metrics['time_taken']
+        nps = int(nodes / elapsed) if elapsed > 0 else 0
+        summary = f"info nodes {nodes} time {elapsed * 1000:.0f} nps {nps}"
+        for key in ('depth_completed', 'pruning_count', 'tt_hit_rate'):
+            if key in metrics:
+                value = metrics[key]
+                summary += f" {key} {value:.3f}" if isinstance(value, float) else f" {key} {value}"
+        self.send(summary)
+        if metrics.get('book_hit'):
+            self.send("info string book move")
+        if 'endgame_result' in metrics:
+            self.send(f"info string solved: {metrics['endgame_result']}")
+        if self.options['stats'] and 'instrumentation' in metrics:
+            report = dict(metrics['instrumentation'])
+            del report['iterations']  # Already sent as info lines
+            self.send(f"info stats {json.dumps(report)}")
+        self.end_search(game, move)
+
+    # A search stopped before finishing depth 1 still answers with a move
+    def fail_search(self, game, error: Exception):
+        if not isinstance(error, engine.SearchTimeout):
+            self.send(f"error search failed: {error}")
+        self.end_search(game, None)
+
+    def end_search(self, game, move: Optional[int]):
+        if move is None:
+            move = next(col for col in engine.get_center_order(game.COLS)
+                        if game.is_valid_move(col))
+        self.searching = False
+        self.send(f"bestmove {move}")
+
+
+def run(input_stream: TextIO, output: TextIO):
+    session = ProtocolSession(output)
+    for line in input_stream:
+        if not session.handle(line.strip()):
+            return
+
+    # End of input lets a running search finish and report
+    while session.searching:
+        time.sleep(0.01)
+    session.engine.shutdown()
+
+
+def main():
+    run(sys.stdin, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import io
+import threading
+import time
+
+import connect_four_engine as engine
+import engine_protocol
+
+
+# Session writing to a buffer, and a way to wait for its search to end
+def new_session():
+    output = io.StringIO()
+    return engine_protocol.ProtocolSession(output), output
+
+
+def wait_for_search(session, timeout=30.0):
+    end = time.time() + timeout
+    while session.searching:
+        assert time.time() < end, "search did not finish"
+        time.sleep(0.005)
+
+
+def summary_line(output):
+    lines = [line for line in output.getvalue().splitlines()
+             if line.startswith('info nodes ')]
+    return dict(zip(*[iter(lines[-1].split()[1:])] * 2))
+
+
+def test_stop_between_jobs_does_not_reach_the_next_search():
+    worker = engine.EngineWorker()
+    game = engine.BitboardConnectFour()
+    agent = engine.AlphaBetaAgent(game, max_depth=3)
+    done = threading.Event()
+    worker.submit(agent, lambda: agent.get_best_move(game, 1), lambda result: done.set())
+    assert done.wait(30)
+
+    # The job has finished, so there is nothing left to stop
+    worker.stop_current()
+    assert not agent.stop_requested
+    worker.shutdown()
+
+
+def test_late_stop_leaves_the_next_search_complete():
+    session, output = new_session()
+    session.handle('go depth 3')
+    wait_for_search(session)
+    session.handle('stop')
+    session.handle('go depth 6')
+    wait_for_search(session)
+    assert summary_line(output)['depth_completed'] == '6'
+    session.handle('quit')
+
+
+def test_go_with_depth_and_movetime_stops_at_the_depth():
+    session, output = new_session()
+    session.handle('go depth 2 movetime 5000')
+    wait_for_search(session)
+    assert summary_line(output)['depth_completed'] == '2'
+    depths = [line.split()[2] for line in output.getvalue().splitlines()
+              if line.startswith('info depth ')]
+    assert depths == ['1', '2']
+    assert output.getvalue().splitlines()[-1].startswith('bestmove ')
+    session.handle('quit')
+
+
+def test_go_with_movetime_alone_deepens_past_the_default_depth():
+    session, output = new_session()
+    session.handle('setoption depth 2')
+    session.handle('go movetime 300')
+    wait_for_search(session)
+    assert int(summary_line(output)['depth_completed']) > 2
+    session.handle('quit')
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+import connect_four_engine as engine
+
+
+BOARDS = [(6, 7, 4), (5, 5, 3), (7, 8, 5)]
+
+
+# The counts kept move by move must equal a full recount of the board
+def assert_consistent(game, evaluator):
+    board = game.board
+    for player in (1, 2):
+        assert game.eval_state.count_windows(player) == evaluator.count_windows(board, player)
+        assert evaluator.evaluate_state(game, player) == evaluator.evaluate_position(board, player)
+
+
+@pytest.mark.parametrize("position_class", [engine.ConnectFour, engine.BitboardConnectFour])
+@pytest.mark.parametrize("rows, cols, connect", BOARDS)
+def test_incremental_counts_follow_moves_and_undos(position_class, rows, cols, connect):
+    rng = random.Random(13)
+    game = position_class(rows, cols, connect)
+    game.enable_incremental_eval()
+    evaluator = engine.Evaluator(game)
+    assert_consistent(game, evaluator)
+
+    for _ in range(400):
+        # Undo about a third of the time, and always once the game is over
+        if game.move_history and (game.is_game_done() or rng.random() < 0.35):
+            game.undo_move()
+        else:
+            game.make_move(rng.choice(game.get_valid_moves()))
+        assert_consistent(game, evaluator)
+
+
+@pytest.mark.parametrize("position_class", [engine.ConnectFour, engine.BitboardConnectFour])
+def test_copies_and_assigned_boards_keep_their_own_counts(position_class):
+    rng = random.Random(7)
+    game = position_class()
+    game.enable_incremental_eval()
+    evaluator = engine.Evaluator(game)
+    for _ in range(10):
+        game.make_move(rng.choice(game.get_valid_moves()))
+
+    copy = game.copy()
+    copy.make_move(rng.choice(copy.get_valid_moves()))
+    assert_consistent(game, evaluator)
+    assert_consistent(copy, evaluator)
+
+    # Assigning a board recounts from scratch; the side to move comes first
+    # as the bitboard splits the pieces by it
+    game.current_player = copy.current_player
+    game.board = copy.board
+    assert_consistent(game, evaluator)
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+import connect_four_engine as engine
+
+
+DEPTH = 5
+
+
+def random_position(rng: random.Random, plies: int):
+    game = engine.BitboardConnectFour()
+    while len(game.move_history) < plies:
+        game.make_move(rng.choice(game.get_valid_moves()))
+        if game.is_game_done():
+            return None
+    return game
+
+
+def mirrored(game):
+    mirror = engine.BitboardConnectFour(game.ROWS, game.COLS)
+    for col in game.move_history:
+        mirror.make_move(game.mirror_move(col))
+    return mirror
+
+
+# Score of one root move for player, from a fresh agent searching the child
+# with the same settings one ply shallower
+def move_score(agent_class, game, col: int, player: int) -> float:
+    game.make_move(col)
+    try:
+        if game.check_winner() == player:
+            return 1000000
+        agent = agent_class(game, max_depth=DEPTH - 1, endgame_threshold=0)
+        return agent.get_best_move(game, player)[1]['best_score']
+    finally:
+        game.undo_move()
+
+
+def positions(count: int):
+    rng = random.Random(15)
+    found = []
+    while len(found) < count:
+        game = random_position(rng, rng.randint(2, 14))
+        if game is not None:
+            found.append(game)
+    return found
+
+
+# Equal scores always. Equal root moves are ordered by the static column
+# order, which is not mirror-symmetric, so the moves only have to mirror
+# each other when the best move is unique: a pair that does not mirror must
+# be a tie.
+@pytest.mark.parametrize("agent_class", [engine.AlphaBetaAgent, engine.PVSAgent])
+def test_mirrored_positions_get_mirrored_moves(agent_class):
+    mirrored_moves = 0
+    for game in positions(30):
+        mirror = mirrored(game)
+        player = game.current_player
+        agent = agent_class(game, max_depth=DEPTH, endgame_threshold=0)
+        move, metrics = agent.get_best_move(game, player)
+        mirror_agent = agent_class(mirror, max_depth=DEPTH, endgame_threshold=0)
+        mirror_move, mirror_metrics = mirror_agent.get_best_move(mirror, player)
+
+        assert metrics['best_score'] == mirror_metrics['best_score']
+        if mirror_move == game.mirror_move(move):
+            mirrored_moves += 1
+        else:
+            other = game.mirror_move(mirror_move)
+            assert move_score(agent_class, game, move, player) == \
+                move_score(agent_class, game, other, player)
+    assert mirrored_moves > 0
+
+
+def test_canonical_keys_match_for_mirrored_positions():
+    for game in positions(30):
+        mirror = mirrored(game)
+        assert game.canonical_key()[0] == mirror.canonical_key()[0]
+        assert game.zobrist_key == mirror.mirror_key
@@ -0,0 +1,271 @@
+import argparse
+import itertools
+import json
+import math
+import random
+import time
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+
+import connect_four_engine as engine
+
+
+ALGORITHMS = {
+    'minimax': 'MinimaxAgent',
+    'alphabeta': 'AlphaBetaAgent',
+    'pvs': 'PVSAgent',
+    'mcts': 'MCTSAgent',
+}
+
+
+# Parse "name=algorithm:key=value,..." into an agent configuration, e.g.
+# "ab6=alphabeta:depth=6,three=12", "fast=pvs:time=0.2" or
+# "mc=mcts:iterations=2000"
+def parse_agent(spec: str) -> Dict:
+    name, _, rest = spec.partition('=')
+    algorithm, _, options = rest.partition(':')
+    if not name or algorithm not in ALGORITHMS:
+        raise argparse.ArgumentTypeError(
+            f"expected name=algorithm[:key=value,...] with algorithm in {sorted(ALGORITHMS)}: {spec}")
+
+    config = {'name': name, 'algorithm': algorithm, 'depth': 5,
+              'time_limit': None, 'iterations': None, 'batch': 32, 'weights': {},
+              'tactics': True}
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        if key == 'depth':
+            config['depth'] = int(value)
+        elif key == 'time':
+            config['time_limit'] = float(value) or None
+        elif key == 'iterations':
+            config['iterations'] = int(value) or None
+        elif key == 'batch':
+            config['batch'] = int(value)
+        elif key == 'tactics':
+            config['tactics'] = value not in ('0', 'false', 'off')
+        elif key in engine.Evaluator.DEFAULT_WEIGHTS:
+            config['weights'][key] = int(value)
+        else:
+            raise argparse.ArgumentTypeError(f"unknown agent option {key!r} in {spec}")
+    return config
+
+
+def create_agent(config: Dict, game):
+    agent_class = getattr(engine, ALGORITHMS[config['algorithm']])
+    if config['algorithm'] == 'minimax':
+        return agent_class(game, max_depth=config['depth'], eval_weights=config['weights'])
+    if config['algorithm'] == 'mcts':
+        return agent_class(game, time_limit=config['time_limit'],
+                           max_iterations=config['iterations'], batch_size=config['batch'],
+                           tactics=config['tactics'])
+    return agent_class(game, max_depth=config['depth'], time_limit=config['time_limit'],
+                       tactics=config['tactics'], eval_weights=config['weights'])
+
+
+# Random openings of the given length that do not end the game
+def random_openings(count: int, plies: int, rows: int, cols: int, connect: int,
+                    seed: int) -> List[List[int]]:
+    rng = random.Random(seed)
+    openings = []
+    while len(openings) < count:
+        game = engine.BitboardConnectFour(rows, cols, connect)
+        moves = []
+        while len(moves) < plies and not game.is_game_done():
+            col = rng.choice(game.get_valid_moves())
+            game.make_move(col)
+            moves.append(col)
+        if len(moves) == plies and not game.is_game_done():
+            openings.append(moves)
+    return openings
+
+
+# Openings from a text file, one game start per line as column numbers
+def load_openings(path: str) -> List[List[int]]:
+    openings = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#')[0].strip()
+            if line:
+                openings.append([int(col) for col in line.replace(',', ' ').split()])
+    return openings
+
+
+# Play one game from an opening, returns its result record
+def play_game(task: Tuple[int, List[int], Dict, Dict, int, int, int]) -> Dict:
+    game_id, opening, first, second, rows, cols, connect = task
+    game = engine.BitboardConnectFour(rows, cols, connect)
+    for col in opening:
+        game.make_move(col)
+
+    agents = {1: create_agent(first, game), 2: create_agent(second, game)}
+    time_used = {1: 0.0, 2: 0.0}
+    nodes = {1: 0, 2: 0}
+    moves = []
+
+    while not game.is_game_done():
+        player = game.current_player
+        start = time.perf_counter()
+        move, metrics = agents[player].get_best_move(game, player)
+        time_used[player] += time.perf_counter() - start
+        nodes[player] += metrics['nodes_explored']
+        game.make_move(move)
+        moves.append(move)
+
+    winner = game.check_winner()
+    return {
+        'game': game_id,
+        'first': first['name'],
+        'second': second['name'],
+        'opening': opening,
+        'moves': moves,
+        'winner': winner,
+        'score_first': 1.0 if winner == 1 else 0.0 if winner == 2 else 0.5,
+        'plies': len(opening) + len(moves),
+        'time_first': round(time_used[1], 4),
+        'time_second': round(time_used[2], 4),
+        'nodes_first': nodes[1],
+        'nodes_second': nodes[2],
+    }
+
+
+# Every pairing plays every opening twice, once with each side moving first
+def schedule_games(agents: List[Dict], openings: List[List[int]],
+                   rows: int, cols: int, connect: int) -> List[Tuple]:
+    tasks = []
+    for a, b in itertools.combinations(agents, 2):
+        for opening in openings:
+            tasks.append((len(tasks), opening, a, b, rows, cols, connect))
+            tasks.append((len(tasks), opening, b, a, rows, cols, connect))
+    return tasks
+
+
+# Elo difference implied by a score fraction
+def elo_difference(score: float) -> float:
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+# Score, Elo difference and 95% interval from a list of game scores (1, 0.5, 0)
+def rate(scores: List[float]) -> Dict:
+    games = len(scores)
+    mean = sum(scores) / games
+    variance = sum((s - mean) ** 2 for s in scores) / games
+    margin = 1.96 * math.sqrt(variance / games)
+    return {
+        'games': games,
+        'wins': sum(1 for s in scores if s == 1.0),
+        'draws': sum(1 for s in scores if s == 0.5),
+        'losses': sum(1 for s in scores if s == 0.0),
+        'score': mean,
+        'score_low': max(0.0, mean - margin),
+        'score_high': min(1.0, mean + margin),
+        'elo': elo_difference(mean),
+        'elo_low': elo_difference(mean - margin),
+        'elo_high': elo_difference(mean + margin),
+    }
+
+
+# Per-pairing and per-agent ratings from a results stream
+def summarize(results: List[Dict]) -> Tuple[Dict, Dict]:
+    pair_scores = {}
+    agent_scores = {}
+    for result in results:
+        first, second = result['first'], result['second']
+        score = result['score_first']
+        a, b = sorted((first, second))
+        pair_scores.setdefault((a, b), []).append(score if first == a else 1 - score)
+        agent_scores.setdefault(first, []).append(score)
+        agent_scores.setdefault(second, []).append(1 - score)
+
+    pairs = {pair: rate(scores) for pair, scores in pair_scores.items()}
+    agents = {name: rate(scores) for name, scores in agent_scores.items()}
+    return pairs, agents
+
+
+def print_report(results: List[Dict]):
+    pairs, agents = summarize(results)
+
+    print(f"\n{len(results)} games")
+    print(f"{'pairing':<32} {'W-D-L':>13} {'score':>7} {'Elo (95% CI)':>26}")
+    for (a, b), r in sorted(pairs.items()):
+        wdl = f"{r['wins']}-{r['draws']}-{r['losses']}"
+        print(f"{a + ' vs ' + b:<32} {wdl:>13} {r['score']:>7.3f} "
+              f"{r['elo']:>+8.1f} [{r['elo_low']:+.1f}, {r['elo_high']:+.1f}]")
+
+    print(f"\n{'agent':<16} {'games':>6} {'score':>7} {'Elo vs field (95% CI)':>30}")
+    for name, r in sorted(agents.items(), key=lambda item: -item[1]['score']):
+        print(f"{name:<16} {r['games']:>6} {r['score']:>7.3f} "
+              f"{r['elo']:>+8.1f} [{r['elo_low']:+.1f}, {r['elo_high']:+.1f}]")
+
+
+def load_results(path: str) -> List[Dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_tournament(agents: List[Dict], openings: List[List[int]], rows: int, cols: int,
+                   connect: int, output: str, workers: Optional[int]) -> List[Dict]:
+    tasks = schedule_games(agents, openings, rows, cols, connect)
+    print(f"{len(tasks)} games between {len(agents)} agents from {len(openings)} openings")
+
+    results = []
+    start = time.perf_counter()
+    with open(output, 'w') as f, Pool(workers) as pool:
+        for result in pool.imap_unordered(play_game, tasks):
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            results.append(result)
+            if len(results) % 50 == 0 or len(results) == len(tasks):
+                elapsed = time.perf_counter() - start
+                print(f"  {len(results)}/{len(tasks)} games ({elapsed:.0f}s)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play agent configurations against each other")
+    parser.add_argument("--agent", dest="agents", type=parse_agent, action="append", default=[],
+                        help="name=algorithm[:depth=N,time=S,iterations=N,batch=N,tactics=0,three=N,two=N,"
+                             "center=N,threat=N]"
+                             " (repeat for each agent)")
+    parser.add_argument("--openings", type=int, default=50,
+                        help="number of random openings, each played with both colors")
+    parser.add_argument("--opening-plies", type=int, default=4,
+                        help="random moves in each opening")
+    parser.add_argument("--opening-file",
+                        help="take openings from this file (one line of columns per opening)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=7)
+    parser.add_argument("--connect", type=int, default=4, help="pieces in a row needed to win")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--output", default="tournament.jsonl",
+                        help="results file, one JSON object per game")
+    parser.add_argument("--report", metavar="RESULTS",
+                        help="only print the report for an existing results file")
+    args = parser.parse_args()
+
+    if args.report:
+        print_report(load_results(args.report))
+        return
+
+    if len(args.agents) < 2:
+        parser.error("at least two --agent configurations are needed")
+    if len({agent['name'] for agent in args.agents}) != len(args.agents):
+        parser.error("agent names must be unique")
+    if not 3 <= args.connect <= max(args.rows, args.cols):
+        parser.error(f"cannot play connect {args.connect} on a {args.rows}x{args.cols} board")
+
+    if args.opening_file:
+        openings = load_openings(args.opening_file)
+    else:
+        openings = random_openings(args.openings, args.opening_plies,
+                                   args.rows, args.cols, args.connect, args.seed)
+
+    results = run_tournament(args.agents, openings, args.rows, args.cols, args.connect,
+                             args.output, args.workers)
+    print_report(results)
+
+
+if __name__ == "__main__":
+    main()